@@ -1,6 +1,9 @@
+import time
 import streamlit as st
-from components import design, psychometric_analysis, career_analysis,google_export
+from config import settings
+from components import design, psychometric_analysis, career_analysis,google_export, memory_view
 from utils import session_manager
+from services.job_runner import Job
 
 # ─── PAGE CONFIG ──────────────────────────────────
 st.set_page_config(page_title="Psychometric Report", layout="centered")
@@ -15,6 +18,10 @@ def main():
     # Initialize session state
     session_manager.initialize_session()
     
+    if settings.MEMORY_VIEW_ENABLED and st.query_params.get("view") == "memory":
+        memory_view.render_memory_view()
+        return
+    
     # Route to appropriate component based on state
     if not session_manager.is_form_submitted():
         # Show upload form
@@ -61,14 +68,24 @@ def render_action_buttons():
     # Edit mode controls
     if session_manager.is_edit_mode():
         st.markdown("<br>", unsafe_allow_html=True)
-        col1, col2, col3 = st.columns([1, 1, 1])
+        col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
         
         with col1:
             if st.button("Reset Changes", use_container_width=True):
                 session_manager.reset_changes()
                 st.rerun()
         
+        with col2:
+            if st.button("Undo", use_container_width=True, disabled=not session_manager.can_undo()):
+                session_manager.undo_change()
+                st.rerun()
+        
         with col3:
+            if st.button("Redo", use_container_width=True, disabled=not session_manager.can_redo()):
+                session_manager.redo_change()
+                st.rerun()
+        
+        with col4:
             if st.button("Save Changes", use_container_width=True):
                 session_manager.save_changes()
                 st.success("Changes saved!")
@@ -84,12 +101,20 @@ def render_action_buttons():
             
             with col1:
                 if st.button("Career Reanalysis", use_container_width=True):
-                    session_manager.request_career_reanalysis()
+                    session_manager.request_career_reanalysis(
+                        force_refresh=st.session_state.get("force_fresh_reanalysis", False)
+                    )
                     st.rerun()
+                st.checkbox(
+                    "Force fresh analysis",
+                    key="force_fresh_reanalysis",
+                    help="Ignore the saved result for an unchanged report and ask n8n again"
+                )
             
             with col2:
                 if st.button("Export to Google Docs", use_container_width=True):
                     request_google_export()
+                    st.rerun()
             
             with col3:
                 if st.button("New Assessment", use_container_width=True):
@@ -110,36 +135,70 @@ def render_action_buttons():
                 if st.button("New Assessment", use_container_width=True):
                     session_manager.reset_all()
                     st.rerun()
+    
+    # Export runs in the background; show its progress or result
+    render_export_status()
 
 def request_google_export():
-    """Request Google Docs export via N8N backend"""
-    
-    with st.spinner("Exporting to Google Docs..."):
-        try:
-            # Prepare the payload exactly as specified
-            payload = {
-                "psychometricData": session_manager.get_report_data(),
-                "careerData": session_manager.get_career_data()
-            }
-            
-            # Send to N8N export workflow
-            result = google_export.request_google_export(payload)
+    """Request Google Docs export via N8N backend in a background job"""
+    
+    # Prepare the payload exactly as specified; to_dict() builds fresh dicts so later edits don't race the upload
+    payload = {
+        "psychometricData": session_manager.get_report_data().to_dict(),
+        "careerData": session_manager.get_career_data().to_dict()
+    }
+    
+    # The last saved versions, so edits can go out as a delta against them
+    original_report = session_manager.get_original_report_data()
+    original_career = session_manager.get_original_career_data()
+    base_payload = None
+    if original_report is not None and original_career is not None:
+        base_payload = {
+            "psychometricData": original_report.to_dict(),
+            "careerData": original_career.to_dict()
+        }
+    
+    # Send to N8N export workflow
+    session_manager.start_job('export', lambda job: google_export.request_google_export(
+        payload,
+        on_wait=job.report_queue_wait,
+        base_payload=base_payload
+    ))
 
-            
-            if result.get("success"):
-                st.success("✅ Report exported to Google Docs successfully!")
-                if result.get("documentUrl"):
-                    st.markdown(f"📄 [Open Google Doc]({result['documentUrl']})")
-                    st.markdown(f'''
-                    <script>
-                    window.open('{result["documentUrl"]}', '_blank');
-                    </script>
-                    ''', unsafe_allow_html=True)
-            else:
-                st.error(f"❌ Export failed: {result.get('error', 'Unknown error')}")
-                
-        except Exception as e:
-            st.error(f"❌ Export failed: {str(e)}")
+def render_export_status():
+    """Show the running or finished export job, if any"""
+    
+    job = session_manager.get_job('export')
+    if job is None:
+        return
+    
+    if not job.done:
+        design.render_queue_wait(job)
+        with st.spinner("Exporting to Google Docs..."):
+            time.sleep(settings.JOB_UI_POLL_INTERVAL)
+        st.rerun()
+    
+    session_manager.clear_job('export')
+    if job.status == Job.FAILED:
+        st.error(f"❌ Export failed: {str(job.error)}")
+        return
+    
+    result = job.result
+    if result.get("success") and result.get("reused"):
+        st.info("This report was already exported with the same content - opening the existing Google Doc.")
+        if result.get("documentUrl"):
+            st.markdown(f"📄 [Open Google Doc]({result['documentUrl']})")
+    elif result.get("success"):
+        st.success("✅ Report exported to Google Docs successfully!")
+        if result.get("documentUrl"):
+            st.markdown(f"📄 [Open Google Doc]({result['documentUrl']})")
+            st.markdown(f'''
+            <script>
+            window.open('{result["documentUrl"]}', '_blank');
+            </script>
+            ''', unsafe_allow_html=True)
+    else:
+        st.error(f"❌ Export failed: {result.get('error', 'Unknown error')}")
 
 if __name__ == "__main__":
     main()
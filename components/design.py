@@ -326,3 +326,10 @@ def apply_styling():
         """,
         unsafe_allow_html=True,
     )
+
+def render_queue_wait(job):
+    """Show how long a background job is expected to queue for the n8n webhooks"""
+    
+    wait = job.details.get('queue_wait')
+    if wait:
+        st.caption(f"⏳ The analysis service is busy - your request starts in about {max(1, round(wait))}s")
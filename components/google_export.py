@@ -1,35 +1,40 @@
-import requests
+from services.api_client import n8n_client
 
-N8N_WEBHOOK_URL = "https://techbh.app.n8n.cloud/webhook/google-export"  # Replace with your actual webhook if different
-
-def request_google_export(payload: dict) -> dict:
+def request_google_export(payload: dict, on_wait=None, base_payload=None) -> dict:
     """
-    Sends a POST request to the n8n webhook to export the report to Google Docs.
+    Export the report to Google Docs through the shared n8n client.
+
+    The call uses the client's pooled connections, timeouts, retry policy,
+    admission control and idempotent export records, like the other webhooks.
 
     Args:
         payload (dict): The complete data structure containing psychometricData and careerData
+        on_wait (callable): Called with the estimated seconds left while queued behind other exports
+        base_payload (dict): The same structure built from the unedited data, used as a delta base
 
     Returns:
-        dict: A dictionary with either {"success": True, "documentUrl": "..."} or {"success": False, "error": "..."}
+        dict: A dictionary with either {"success": True, "documentUrl": "..."} or {"success": False, "error": "..."};
+              "reused" is True when unchanged content was already exported
     """
     try:
-        response = requests.post(N8N_WEBHOOK_URL, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Assume the n8n workflow returns { documentUrl: "...", ... }
-        if "documentUrl" in data:
-            return {
-                "success": True,
-                "documentUrl": data["documentUrl"]
-            }
-        else:
-            return {
-                "success": False,
-                "error": "No document URL returned from n8n"
-            }
-    except requests.exceptions.RequestException as e:
+        data = n8n_client.request_google_export(payload, on_wait=on_wait, base_payload=base_payload)
+    except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
+
+    # The n8n workflow returns { documentUrl: "...", ... }
+    if data.get("documentUrl"):
+        result = {
+            "success": True,
+            "documentUrl": data["documentUrl"]
+        }
+        if data.get("reused"):
+            result["reused"] = True
+        return result
+    else:
+        return {
+            "success": False,
+            "error": data.get("error") or "No document URL returned from n8n"
+        }
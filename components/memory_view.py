@@ -0,0 +1,41 @@
+import pandas as pd
+import streamlit as st
+from services.session_memory import session_memory
+from services.upload_spool import upload_spool
+
+def format_bytes(size):
+    """Human-readable byte count"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def render_memory_view():
+    """Per-session memory use of this Streamlit process, largest first"""
+
+    st.markdown('<h1 class="doc-title">Session Memory</h1>', unsafe_allow_html=True)
+
+    rows = session_memory.report()
+    spool = upload_spool.usage()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Active sessions", len(rows))
+    col2.metric("Session state", format_bytes(sum(row["total_bytes"] for row in rows)))
+    col3.metric("Spooled uploads", f"{spool['files']} / {format_bytes(spool['bytes'])}")
+    st.caption(f"Idle sessions evicted so far: {session_memory.evictions}")
+
+    table = []
+    for row in rows:
+        largest = sorted(row["keys"].items(), key=lambda item: item[1], reverse=True)[:3]
+        table.append([
+            row["session_id"][:8],
+            f"{row['idle_seconds'] / 60:.0f} min",
+            format_bytes(row["total_bytes"]),
+            ", ".join(f"{key} {format_bytes(size)}" for key, size in largest)
+        ])
+    st.dataframe(
+        pd.DataFrame(table, columns=["Session", "Idle", "State size", "Largest keys"]),
+        hide_index=True,
+        use_container_width=True
+    )
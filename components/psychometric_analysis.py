@@ -1,8 +1,17 @@
+import time
+from functools import lru_cache
 import streamlit as st
-import pandas as pd
 import requests
 from utils import session_manager
+from components import design
 from services.api_client import n8n_client
+from services.cache import hash_upload
+from services.retry import CircuitOpenError
+from services.rate_limiter import AdmissionTimeoutError
+from services.image_preprocessing import preprocess_uploads
+from services.job_runner import Job
+from services.models import display_text
+from config import settings
 
 # ─── TEST CONFIGURATIONS ──────────────────────────────
 TEST_CONFIGS = [
@@ -10,25 +19,29 @@ TEST_CONFIGS = [
         "key": "test16PersonalityData",
         "title": "MBTI-style Personality Type",
         "subtitle": "Categorizes people into 16 personality types based on 5 preferences: how you gain energy (Introvert/Extravert), how you process information (Intuitive/Observant), how you make decisions (Thinking/Feeling), how you approach life (Judging/Prospecting), and how you see yourself (Assertive/Turbulent).",
-        "headers": ["Preference", "Score", "Meaning"]
+        "headers": ["Preference", "Score", "Meaning"],
+        "columns": ("preference", "score", "meaning")  # Row fields under each header
     },
     {
         "key": "high5Data",
         "title": "HIGH5 Strengths Themes",
         "subtitle": "Identifies your top 5 natural strengths from 20 possible talents (like Empathizer, Brainstormer, Deliverer). Focuses on what energizes you and where you have the greatest potential for success.",
-        "headers": ["Strength", "Domain", "Meaning"]
+        "headers": ["Strength", "Domain", "Meaning"],
+        "columns": ("preference", "domain", "meaning")  # HIGH5 has a domain instead of a score
     },
     {
         "key": "bigFiveData",
         "title": "Big Five Personality Traits (OCEAN)",
         "subtitle": "Measures 5 core personality dimensions: Openness (creativity), Conscientiousness (organization), Extraversion (sociability), Agreeableness (cooperation), Neuroticism (emotional stability).",
-        "headers": ["Trait", "Score", "Meaning"]
+        "headers": ["Trait", "Score", "Meaning"],
+        "columns": ("preference", "score", "meaning")
     },
     {
         "key": "riasecData",
         "title": "RIASEC Career Interest Themes",
         "subtitle": "Assesses career interests across 6 work personality types: Realistic (hands-on), Investigative (analytical), Artistic (creative), Social (helping others), Enterprising (leading), Conventional (organized tasks).",
-        "headers": ["Theme", "Score", "Meaning"]
+        "headers": ["Theme", "Score", "Meaning"],
+        "columns": ("preference", "score", "meaning")
     }
 ]
 
@@ -65,78 +78,147 @@ def render_upload_form():
             st.rerun()
 
 def process_uploaded_data():
-    """Process uploaded data using N8N API"""
+    """Process uploaded data using N8N API in a background job, polling it on each rerun"""
     
     form_data_dict = session_manager.get_form_data()
-    student_name = form_data_dict['name']
+    student_name = form_data_dict['name'] or "student"
+    
+    job = session_manager.get_job('report')
+    if job is None:
+        if not form_data_dict['uploaded_files']:
+            # Nothing to resume (e.g. the job result expired) - back to the form
+            session_manager.reset_form()
+            st.rerun()
+        job = session_manager.start_job('report', lambda job: run_report_job(job, form_data_dict))
     
     with st.spinner(f"Analyzing test results for {student_name}..."):
-        progress = st.progress(0)
-        status = st.empty()
-        
-        status.text("Uploading images...")
-        progress.progress(20)
+        st.progress(job.progress)
+        st.text(job.message)
+        design.render_queue_wait(job)
+        image_stats = job.details.get('image_stats')
+        if image_stats:
+            st.caption(
+                f"Images optimized in {image_stats['seconds']:.1f}s - "
+                f"{image_stats['bytes_saved'] / 1024 / 1024:.1f} MB saved "
+                f"({image_stats['original_bytes'] / 1024 / 1024:.1f} MB → {image_stats['processed_bytes'] / 1024 / 1024:.1f} MB)"
+            )
         
-        # Prepare form data
-        form_data = {
-            "name": form_data_dict['name'],
-            "age": str(form_data_dict['age']),
-            "grade": form_data_dict['grade'],
-            "fileCount": str(len(form_data_dict['uploaded_files'])),
-        }
-        
-        # Prepare files
-        files = []
-        for i, f in enumerate(form_data_dict['uploaded_files']):
-            f.seek(0)
-            files.append((f"data{i}", (f.name, f.read(), f.type)))
+        if not job.done:
+            time.sleep(settings.JOB_UI_POLL_INTERVAL)
+            st.rerun()
         
-        try:
-            status.text("Processing test data...")
-            progress.progress(50)
-            
-            # Upload to N8N
-            payload = n8n_client.upload_psychometric_data(form_data, files)
-            
-            status.text("Generating insights...")
-            progress.progress(80)
-            
+        session_manager.clear_job('report')
+        if job.status == Job.COMPLETED:
             # Store the results
-            session_manager.store_report_data(payload)
-            
-            progress.progress(100)
-            status.text("Report ready!")
+            session_manager.store_report_data(job.result)
+            st.progress(100)
+            st.text("Report ready!")
             
             # Small delay to show completion, then rerun
-            import time
             time.sleep(1)
             st.rerun()
-            
-        except requests.exceptions.Timeout:
-            st.error("Request timed out. The server may be busy. Please try again.")
-            session_manager.reset_form()
-            st.stop()
-            
-        except requests.exceptions.ConnectionError:
-            st.error("Connection failed. Please check your internet connection and try again.")
-            session_manager.reset_form()
-            st.stop()
-            
-        except requests.exceptions.HTTPError as e:
-            st.error(f"Server error: {e}")
-            session_manager.reset_form()
-            st.stop()
-            
-        except Exception as e:
-            st.error(f"Could not generate report: {e}")
-            st.error("Please try uploading fewer or smaller images, or try again later.")
-            session_manager.reset_form()
-            st.stop()
+        
+        show_upload_error(job.error)
+        session_manager.reset_form()
+        st.stop()
+
+def run_report_job(job, form_data_dict):
+    """Background job: preprocess the screenshots and upload them to N8N"""
+    
+    # Prepare form data
+    form_data = {
+        "name": form_data_dict['name'],
+        "age": str(form_data_dict['age']),
+        "grade": form_data_dict['grade'],
+        "fileCount": str(len(form_data_dict['uploaded_files'])),
+    }
+    
+    # A repeat submission is answered from the cache before any preprocessing
+    uploaded_files = form_data_dict['uploaded_files']
+    cache_key = hash_upload(form_data, [(f"data{i}", (f.name, f, f.type)) for i, f in enumerate(uploaded_files)])
+    cached = n8n_client.cached_report(cache_key)
+    if cached is not None:
+        return cached
+    
+    # In job mode the upload returns quickly and n8n reports real progress afterwards
+    upload_share = 30 if settings.USE_JOB_MODE else 90
+    
+    # Prepare files - originals are streamed from the upload buffers; only the
+    # downscaled copies preprocessing makes are held in memory
+    files = prepare_upload_files(uploaded_files, job)
+    
+    # Upload to N8N
+    job.update(message="Uploading images...")
+    return n8n_client.upload_psychometric_data(
+        form_data,
+        files,
+        on_retry=lambda attempt, delay, error: job.update(
+            message=f"Connection issue, retrying in {delay:.0f}s... (attempt {attempt})"
+        ),
+        progress_callback=make_upload_progress_callback(job, upload_share),
+        on_job_status=make_job_status_callback(job, upload_share),
+        on_wait=job.report_queue_wait,
+        cache_key=cache_key
+    )
+
+def show_upload_error(error):
+    """Explain a failed report job to the user"""
+    
+    if isinstance(error, requests.exceptions.Timeout):
+        st.error("Request timed out. The server may be busy. Please try again.")
+    elif isinstance(error, requests.exceptions.ConnectionError):
+        st.error("Connection failed. Please check your internet connection and try again.")
+    elif isinstance(error, requests.exceptions.HTTPError):
+        st.error(f"Server error: {error}")
+    elif isinstance(error, (CircuitOpenError, AdmissionTimeoutError)):
+        st.error(str(error))
+    else:
+        st.error(f"Could not generate report: {error}")
+        st.error("Please try uploading fewer or smaller images, or try again later.")
+
+def prepare_upload_files(uploaded_files, job):
+    """Downscale and recompress screenshots before upload, falling back to the originals"""
+    
+    if not settings.IMAGE_PREPROCESSING_ENABLED:
+        return [(f"data{i}", (f.name, f, f.type)) for i, f in enumerate(uploaded_files)]
+    
+    job.update(message="Optimizing images...")
+    processed, stats = preprocess_uploads(
+        uploaded_files,
+        on_progress=lambda done, total: job.update(message=f"Optimizing images... ({done}/{total})")
+    )
+    job.details['image_stats'] = stats
+    return [(f"data{i}", file_tuple) for i, file_tuple in enumerate(processed)]
+
+def make_upload_progress_callback(job, upload_share=90):
+    """Return a callback that drives job progress from bytes actually sent"""
+    
+    def on_progress(bytes_sent, total_bytes):
+        # Uploading fills the bar to upload_share%; the rest is n8n processing time
+        job.update(progress=upload_share * bytes_sent / total_bytes if total_bytes else upload_share)
+        if bytes_sent >= total_bytes:
+            job.update(message="Processing test data...")
+        else:
+            job.update(message=f"Uploading images... {bytes_sent / 1024 / 1024:.1f} of {total_bytes / 1024 / 1024:.1f} MB")
+    
+    return on_progress
+
+def make_job_status_callback(job, upload_share=30):
+    """Return a callback that drives job progress from the n8n analysis job status"""
+    
+    def on_status(status):
+        n8n_progress = status.get("progress") or 0
+        job.update(
+            progress=upload_share + (100 - upload_share) * n8n_progress / 100,
+            message=status.get("stage") or f"Analysis {status.get('status', 'running')}..."
+        )
+    
+    return on_status
 
 def render_report():
     """Render the complete psychometric report (assumes data is already processed)"""
     
-    payload = session_manager.get_report_data()
+    report = session_manager.get_report_data()
     student_info = session_manager.get_student_info()
     
     # Header Section
@@ -159,11 +241,8 @@ def render_report():
         )
     
     # Display test sections
-    test_data = payload.get("testData", {})
-    insights = payload.get("insightLines", [])
-    
     for i, config in enumerate(TEST_CONFIGS):
-        rows = test_data.get(config["key"], [])
+        rows = report.test_data.get(config["key"])
         if not rows:
             continue
         
@@ -177,8 +256,9 @@ def render_report():
             render_read_only_table(config, rows)
         
         # Add insight if available
-        if i < len(insights):
-            render_insight(insights[i], i)
+        insight_index = report.insight_index(config["key"], i)
+        if insight_index is not None:
+            render_insight(report.insights[insight_index], insight_index)
 
 def render_editable_table(config, rows, test_index):
     """Render an editable table for a specific test type"""
@@ -193,39 +273,33 @@ def render_editable_table(config, rows, test_index):
         # HIGH5 has different structure (no score field)
         for j, row in enumerate(rows):
             col1, col2, col3 = st.columns([1, 1, 3])
+            path = ("test_data", config["key"], j)
             
             with col1:
-                new_preference = st.text_input(
+                session_manager.edit_report((*path, "preference"), st.text_input(
                     f"Strength {j+1}",
-                    value=row.get("preference", ""),
-                    key=f"{config['key']}_pref_{j}",
+                    value=display_text(row.preference),
+                    key=session_manager.edit_key(f"{config['key']}_pref_{j}"),
                     label_visibility="collapsed"
-                )
+                ), shown=display_text(row.preference))
             
             with col2:
-                new_domain = st.text_input(
+                session_manager.edit_report((*path, "domain"), st.text_input(
                     f"Domain {j+1}",
-                    value=row.get("domain", ""),
-                    key=f"{config['key']}_domain_{j}",
+                    value=display_text(row.domain),
+                    key=session_manager.edit_key(f"{config['key']}_domain_{j}"),
                     label_visibility="collapsed"
-                )
+                ), shown=display_text(row.domain))
             
             with col3:
-                new_meaning = st.text_area(
+                # Rows are shared between versions; edits go through the session's store
+                session_manager.edit_report((*path, "meaning"), st.text_area(
                     f"Meaning {j+1}",
-                    value=row.get("meaning", ""),
-                    key=f"{config['key']}_meaning_{j}",
+                    value=display_text(row.meaning),
+                    key=session_manager.edit_key(f"{config['key']}_meaning_{j}"),
                     height=80,
                     label_visibility="collapsed"
-                )
-            
-            # Update the data in session state
-            report_data = session_manager.get_report_data()
-            report_data["testData"][config["key"]][j].update({
-                "preference": new_preference,
-                "domain": new_domain,
-                "meaning": new_meaning
-            })
+                ), shown=display_text(row.meaning))
     
     else:
         # Show column headers
@@ -237,104 +311,99 @@ def render_editable_table(config, rows, test_index):
         # Standard structure for other tests
         for j, row in enumerate(rows):
             col1, col2, col3 = st.columns([1, 1, 3])
+            path = ("test_data", config["key"], j)
             
             with col1:
                 if config["key"] == "test16PersonalityData":
                     # For 16 personalities, preference is read-only
                     st.text_input(
                         f"Preference {j+1}",
-                        value=row.get("preference", ""),
-                        key=f"{config['key']}_pref_{j}_readonly",
+                        value=display_text(row.preference),
+                        key=session_manager.edit_key(f"{config['key']}_pref_{j}_readonly"),
                         disabled=True,
                         label_visibility="collapsed"
                     )
-                    new_preference = row.get("preference", "")
                 else:
-                    new_preference = st.text_input(
+                    session_manager.edit_report((*path, "preference"), st.text_input(
                         f"Preference {j+1}",
-                        value=row.get("preference", ""),
-                        key=f"{config['key']}_pref_{j}",
+                        value=display_text(row.preference),
+                        key=session_manager.edit_key(f"{config['key']}_pref_{j}"),
                         label_visibility="collapsed"
-                    )
+                    ), shown=display_text(row.preference))
             
             with col2:
-                new_score = st.text_input(
+                session_manager.edit_report((*path, "score"), st.text_input(
                     f"Score {j+1}",
-                    value=row.get("score", ""),
-                    key=f"{config['key']}_score_{j}",
+                    value=display_text(row.score),
+                    key=session_manager.edit_key(f"{config['key']}_score_{j}"),
                     label_visibility="collapsed"
-                )
+                ), shown=display_text(row.score))
             
             with col3:
-                new_meaning = st.text_area(
+                session_manager.edit_report((*path, "meaning"), st.text_area(
                     f"Meaning {j+1}",
-                    value=row.get("meaning", ""),
-                    key=f"{config['key']}_meaning_{j}",
+                    value=display_text(row.meaning),
+                    key=session_manager.edit_key(f"{config['key']}_meaning_{j}"),
                     height=80,
                     label_visibility="collapsed"
-                )
-            
-            # Update the data in session state
-            report_data = session_manager.get_report_data()
-            report_data["testData"][config["key"]][j].update({
-                "preference": new_preference,
-                "score": new_score,
-                "meaning": new_meaning
-            })
+                ), shown=display_text(row.meaning))
 
 def render_read_only_table(config, rows):
     """Render a read-only table using Google Docs styling"""
-    
-    if config["key"] == "high5Data":
-        # HIGH5 special display - only show preference, domain, meaning
-        table_data = []
-        for row in rows:
-            table_data.append([
-                row.get("preference", ""),
-                row.get("domain", ""),
-                row.get("meaning", "")
-            ])
-        
-        headers = ["Strength", "Domain", "Meaning"]
-        df = pd.DataFrame(table_data, columns=headers)
-    else:
-        # Standard display - show preference, score, meaning
-        table_data = []
-        for row in rows:
-            table_data.append([
-                row.get("preference", ""),
-                row.get("score", ""),
-                row.get("meaning", "")
-            ])
-        
-        df = pd.DataFrame(table_data, columns=config["headers"])
-    
-    # Convert to HTML for custom styling
-    html_table = df.to_html(index=False, escape=False)
-    html_table = html_table.replace('<td>', '<td style="padding: 12px; border: 1px solid #dadce0; vertical-align: top; color: #202124; font-size: 17px; font-family: Inter, sans-serif;">')
-    html_table = html_table.replace('<th>', '<th style="background-color: #f8f9fa; border: 1px solid #dadce0; padding: 12px; text-align: left; font-weight: 500; color: #202124; font-size: 17px; font-family: Inter, sans-serif;">')
-    html_table = html_table.replace('<table border="1" class="dataframe">', '<table class="doc-table" style="width: 100%; border-collapse: collapse; margin: 20px 0; font-size: 17px; font-family: Inter, sans-serif;">')
-    
-    st.markdown(html_table, unsafe_allow_html=True)
+    st.markdown(table_html(tuple(config["headers"]), table_cells(config, rows)), unsafe_allow_html=True)
 
-def render_insight(insight_text, insight_index):
+# ─── TABLE HTML ──────────────────────────────
+TABLE_TAG = '<table class="doc-table" style="width: 100%; border-collapse: collapse; margin: 20px 0; font-size: 17px; font-family: Inter, sans-serif;">'
+TH_TAG = '<th style="background-color: #f8f9fa; border: 1px solid #dadce0; padding: 12px; text-align: left; font-weight: 500; color: #202124; font-size: 17px; font-family: Inter, sans-serif;">'
+TD_TAG = '<td style="padding: 12px; border: 1px solid #dadce0; vertical-align: top; color: #202124; font-size: 17px; font-family: Inter, sans-serif;">'
+
+def table_cells(config, rows):
+    """Cell text for each row, in the order of config["columns"]"""
+    return tuple(
+        tuple(display_text(getattr(row, column)) for column in config["columns"])
+        for row in rows
+    )
+
+@lru_cache(maxsize=settings.TABLE_HTML_CACHE_ENTRIES)
+def table_html(headers, cells):
+    """
+    Styled HTML for a read-only table, built directly instead of through a DataFrame
+
+    Cached by the header and cell text, so sections whose rows haven't changed
+    are not rebuilt on every rerun. Cell text is not escaped, same as the
+    previous DataFrame.to_html(escape=False) output.
+
+    Args:
+        headers (tuple): Column titles
+        cells (tuple): One tuple of cell text per row
+
+    Returns:
+        str: The <table> markup
+    """
+    parts = [TABLE_TAG, '<thead><tr style="text-align: right;">']
+    parts.extend(f"{TH_TAG}{header}</th>" for header in headers)
+    parts.append("</tr></thead><tbody>")
+    for row in cells:
+        parts.append("<tr>")
+        parts.extend(f"{TD_TAG}{cell}</td>" for cell in row)
+        parts.append("</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+def render_insight(insight, insight_index):
     """Render insight section (editable or read-only)"""
     
     if session_manager.is_edit_mode():
         st.write("**Insight:**")
-        new_insight = st.text_area(
+        session_manager.edit_report(("insights", insight_index, "text"), st.text_area(
             "Edit insight",
-            value=insight_text.replace("INSIGHT: ", ""),
-            key=f"insight_{insight_index}",
+            value=insight.text,
+            key=session_manager.edit_key(f"insight_{insight_index}"),
             height=100,
             label_visibility="collapsed"
-        )
-        # Update insight in session state
-        report_data = session_manager.get_report_data()
-        report_data["insightLines"][insight_index] = f"INSIGHT: {new_insight}"
+        ))
     else:
-        clean_insight = insight_text.replace("INSIGHT: ", "")
         st.markdown(
-            f'<div class="insight-box"><span class="insight-label">Insight:</span> {clean_insight}</div>',
+            f'<div class="insight-box"><span class="insight-label">Insight:</span> {insight.text}</div>',
             unsafe_allow_html=True
         )
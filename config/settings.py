@@ -6,6 +6,20 @@ N8N_BASE_URL = "https://techbh.app.n8n.cloud/webhook"
 PSYCHOMETRIC_UPLOAD_ENDPOINT = "/google-report-upload"
 CAREER_ANALYSIS_ENDPOINT = "/google-career-analysis"
 GOOGLE_EXPORT_ENDPOINT = "/google-export"
+PSYCHOMETRIC_JOB_ENDPOINT = "/google-report-jobs"
+JOB_STATUS_ENDPOINT = "/google-report-jobs"  # GET {endpoint}/{jobId}?wait=seconds
+PSYCHOMETRIC_IMAGE_ENDPOINT = "/google-report-upload-image"
+
+# Per-Image Upload - analyze each screenshot in its own concurrent request and
+# merge the sections locally (needs the per-image webhook)
+USE_PER_IMAGE_UPLOAD = False
+
+# Job Mode - submit the upload as a job and poll for its result instead of
+# holding one request open for the whole analysis (needs job-aware webhooks)
+USE_JOB_MODE = False
+JOB_LONG_POLL_SECONDS = 20
+JOB_POLL_INTERVAL = 2  # Seconds between polls when the server does not long-poll
+JOB_MAX_WAIT = 600
 
 # App Configuration
 APP_TITLE = "Psychometric Assessment Report"
@@ -15,10 +29,127 @@ SUPPORTED_FILE_TYPES = ["jpg", "jpeg", "png"]
 MIN_AGE = 5
 MAX_AGE = 18
 
+# Image Preprocessing
+IMAGE_PREPROCESSING_ENABLED = True
+IMAGE_MAX_DIMENSION = 1600  # Longest side in pixels; enough for OCR/vision on screenshots
+IMAGE_JPEG_QUALITY = 85
+IMAGE_WHITESPACE_THRESHOLD = 10  # Grey levels below white that count as content
+IMAGE_PREPROCESS_WORKERS = 2
+
 # Request Configuration
 CONNECTION_TIMEOUT = 30
 READ_TIMEOUT = 180
-MAX_RETRIES = 3
+JSON_READ_TIMEOUT = 120  # Career analysis and export calls
+MAX_RETRIES = 3  # Total attempts per webhook call
+MAX_RESPONSE_BYTES = 20 * 1024 * 1024  # Larger webhook responses are rejected while streaming
+
+# Request Compression - career analysis and export bodies above the threshold are
+# gzipped; a 400/415/422 answered to a compressed body is retried as plain JSON,
+# and switches the client to plain bodies if that succeeds. Off until the
+# production webhooks are confirmed to accept Content-Encoding: gzip
+REQUEST_COMPRESSION_ENABLED = False
+REQUEST_COMPRESSION_MIN_BYTES = 1024
+REQUEST_COMPRESSION_ENCODING = "gzip"  # or "deflate"
+REQUEST_COMPRESSION_LEVEL = 6
+
+# Delta Payloads - edited reports are sent as changes against a version the
+# webhook already received; needs webhooks that rebuild deltas and answer 409
+# for unknown bases
+DELTA_PAYLOADS_ENABLED = False
+DELTA_KNOWN_VERSIONS = 256  # Versions remembered per client as possible delta bases
+
+# Report Editing
+EDIT_HISTORY_LIMIT = 100  # Edits that can be undone per session
+
+# Background Jobs
+JOB_RUNNER_WORKERS = 8  # Jobs of one kind running at once across all sessions
+# Per-kind pools, at least the endpoint's concurrency cap so a job waiting for
+# admission shows its queue estimate instead of "Waiting to start..."
+JOB_RUNNER_WORKERS_BY_KIND = {
+    "report": 8,
+    "career": 8,
+    "export": 4
+}
+JOB_RESULT_TTL = 3600  # Seconds an uncollected job result is kept
+JOB_UI_POLL_INTERVAL = 1  # Seconds between reruns while a job is running
+SHARED_JOB_STATE = True  # Publish jobs to the session store so every worker process sees them
+JOB_STATE_SYNC_INTERVAL = 0.5  # Seconds between progress writes to the store
+JOB_HEARTBEAT_INTERVAL = 10  # Seconds between republishing running jobs
+JOB_STALE_AFTER = 60  # Seconds without a heartbeat before a running job counts as lost
+
+# Retry / Circuit Breaker
+RETRY_BASE_DELAY = 1.0  # Seconds; doubled per attempt with full jitter
+RETRY_MAX_DELAY = 20.0
+RETRY_BUDGET_RATIO = 0.2  # Retries allowed per first attempt
+RETRY_BUDGET_MAX_TOKENS = 10  # Retries that can be banked for a burst of failures
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures before failing fast
+CIRCUIT_RECOVERY_TIMEOUT = 30  # Seconds before a probe request is let through
+
+# Admission Control - shared by every session in the process so bursts queue
+# here instead of exceeding the n8n plan's concurrent executions
+RATE_LIMIT_PER_SECOND = 2.0  # Webhook calls started per second, all endpoints
+RATE_LIMIT_BURST = 10  # Calls that can start back to back after a quiet period
+ENDPOINT_CONCURRENCY_LIMITS = {
+    PSYCHOMETRIC_UPLOAD_ENDPOINT: 4,
+    PSYCHOMETRIC_IMAGE_ENDPOINT: 8,
+    PSYCHOMETRIC_JOB_ENDPOINT: 4,
+    CAREER_ANALYSIS_ENDPOINT: 4,
+    GOOGLE_EXPORT_ENDPOINT: 2
+}
+DEFAULT_ENDPOINT_CONCURRENCY = 8  # Endpoints not listed above, e.g. job status polls
+ESTIMATED_CALL_SECONDS = 30  # Assumed call duration until real timings are measured
+ADMISSION_TIMEOUT = 300  # Seconds a call may queue before giving up
+
+# Request Hedging - send a second career analysis request when the first is
+# slower than HEDGE_PERCENTILE of recent calls; the first answer wins
+CAREER_HEDGING_ENABLED = False
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20  # Recent calls needed before the percentile is trusted
+HEDGE_DEFAULT_DELAY = 30  # Seconds before hedging until enough samples exist
+HEDGE_LATENCY_WINDOW = 200  # Recent call durations kept for the percentile
+HEDGE_WORKERS = 8
+
+# Connection Pooling
+POOL_MAX_CONNECTIONS = 20  # Total keep-alive connections per client
+POOL_MAX_PER_HOST = 10  # Keep-alive connections to a single host; raise with Streamlit concurrency
+
+# Result Caching
+CACHE_DIR = ".cache"
+UPLOAD_CACHE_MEMORY_ENTRIES = 64
+UPLOAD_CACHE_TTL = 7 * 24 * 3600  # Seconds an on-disk report stays reusable
+UPLOAD_CACHE_MAX_BYTES = 200 * 1024 * 1024
+CAREER_CACHE_MEMORY_ENTRIES = 128
+CAREER_CACHE_TTL = 24 * 3600  # Seconds before an unchanged report is re-analyzed anyway
+CAREER_CACHE_MAX_BYTES = 50 * 1024 * 1024
+EXPORT_RECORD_TTL = 30 * 24 * 3600  # Seconds an exported doc is reused for unchanged content
+TABLE_HTML_CACHE_ENTRIES = 256  # Rendered read-only test tables kept in memory, keyed by their content
+
+# Session Persistence - reports, career analyses and edits are written through
+# to SQLite so a refresh or restart reconnects by the sid in the URL. The sid is
+# random but it is the only key: anyone with the URL (browser history, a shared
+# link or screen) can reopen the student's report until it expires or "New
+# assessment" deletes it. Streamlit can't set cookies, so there is no secret
+# outside the URL; keep the retention short. A second open tab with the same
+# sid continues on a copy instead of sharing the session
+SESSION_STORE_ENABLED = True
+SESSION_DB_FILE = "sessions.db"  # Inside CACHE_DIR
+SESSION_RETENTION = 24 * 3600  # Seconds an untouched session is kept
+SESSION_DB_BUSY_TIMEOUT = 5  # Seconds a write waits for another writer
+# Where sessions and job state live; every worker process must point at the same one
+SESSION_STORE_BACKEND = "sqlite"  # "sqlite", "file" or "server" (python -m scripts.state_server)
+SESSION_FILE_DIR = None  # "file" backend folder, default CACHE_DIR/sessions
+STATE_SERVER_URL = "http://127.0.0.1:8766"
+STATE_SERVER_TIMEOUT = 5
+STATE_SERVER_UPDATE_ATTEMPTS = 10  # Compare-and-set retries before a shared write gives up
+
+# Session Memory - screenshots leave session state once the report is stored,
+# and idle sessions drop their report until they come back (needs SESSION_STORE_ENABLED)
+UPLOAD_SPOOL_ENABLED = True  # Keep screenshots in a content-addressed spool; False drops them
+UPLOAD_SPOOL_DIR = "upload_spool"  # Inside CACHE_DIR
+UPLOAD_SPOOL_TTL = 24 * 3600  # Seconds a spooled screenshot is kept
+SESSION_IDLE_TIMEOUT = 15 * 60  # Seconds without a rerun before a session's report is evicted
+SESSION_EVICT_INTERVAL = 60  # Seconds between idle-session sweeps
+MEMORY_VIEW_ENABLED = False  # Serve per-session memory use at ?view=memory
 
 # Test Configuration
 TEST_TYPES = [
@@ -27,3 +158,11 @@ TEST_TYPES = [
     "Big Five Personality Traits (OCEAN)",
     "RIASEC Career Interest Themes"
 ]
+# testData keys in report order; insightLines[i] belongs to TEST_DATA_KEYS[i]
+# unless the report names each line's test in insightKeys (merged per-image uploads)
+TEST_DATA_KEYS = [
+    "test16PersonalityData",
+    "high5Data",
+    "bigFiveData",
+    "riasecData"
+]
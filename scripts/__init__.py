@@ -0,0 +1,2 @@
+# scripts/__init__.py
+# This file makes the scripts directory a Python package
@@ -0,0 +1,215 @@
+# scripts/batch_process.py
+# Headless cohort intake: upload -> career analysis -> Google export for a roster
+#
+# Usage: python -m scripts.batch_process roster.csv screenshots/ --concurrency 4
+#
+# The roster needs name, age and grade columns; optional columns are
+# student_id (defaults to name) and folder (defaults to student_id), the
+# sub-directory of the screenshots directory holding that student's images.
+# With --base-url pointing anywhere but settings.N8N_BASE_URL (staging, the
+# mock server), results are cached under their own folder in CACHE_DIR so
+# they never reach the app's upload, career and export caches.
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import settings
+from services.api_client import N8NClient, n8n_client
+from services.cache import hash_upload
+from services.image_preprocessing import preprocess_uploads
+from services.payloads import build_career_request
+
+class LocalScreenshot(io.BytesIO):
+    """Screenshot read from disk, shaped like Streamlit's UploadedFile"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+        self.type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+def read_roster(path):
+    """Read the roster CSV into a list of student dicts"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        students = []
+        for row in csv.DictReader(f):
+            row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            row["student_id"] = row.get("student_id") or row["name"]
+            row["folder"] = row.get("folder") or row["student_id"]
+            students.append(row)
+        return students
+
+def load_screenshots(directory):
+    """Return the student's screenshots in file name order"""
+    extensions = tuple(f".{extension}" for extension in settings.SUPPORTED_FILE_TYPES)
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(extensions))
+    if not names:
+        raise FileNotFoundError(f"No screenshots found in {directory}")
+    return [LocalScreenshot(os.path.join(directory, name)) for name in names]
+
+# ─── CHECKPOINT ──────────────────────────────
+class Checkpoint:
+    """Append-only JSON-lines record of finished students, used to resume a run"""
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        if record.get("status") == "completed":
+                            self.completed[record["student_id"]] = record
+
+    def record(self, result):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+            if result["status"] == "completed":
+                self.completed[result["student_id"]] = result
+
+# ─── PIPELINE ──────────────────────────────
+def process_student(client, student, screenshots_dir, run_career, run_export):
+    """
+    Run one student through the same pipeline as the Streamlit app
+
+    Returns:
+        dict: Manifest entry with status, per-stage timings, document URL and error
+    """
+    result = {
+        "student_id": student["student_id"],
+        "name": student["name"],
+        "status": "failed",
+        "timings": {},
+        "documentUrl": None,
+        "error": None
+    }
+    stage_started = time.perf_counter()
+
+    def finish_stage(stage):
+        nonlocal stage_started
+        now = time.perf_counter()
+        result["timings"][stage] = round(now - stage_started, 3)
+        stage_started = now
+
+    try:
+        uploaded_files = load_screenshots(os.path.join(screenshots_dir, student["folder"]))
+        form_data = {
+            "name": student["name"],
+            "age": student["age"],
+            "grade": student["grade"],
+            "fileCount": str(len(uploaded_files)),
+        }
+        # Keyed on the screenshots as read, so a rerun skips preprocessing too
+        cache_key = hash_upload(form_data, [(f"data{i}", (f.name, f, f.type)) for i, f in enumerate(uploaded_files)])
+        report = client.cached_report(cache_key)
+        if report is None:
+            if settings.IMAGE_PREPROCESSING_ENABLED:
+                processed, _ = preprocess_uploads(uploaded_files)
+            else:
+                processed = [(f.name, f, f.type) for f in uploaded_files]
+            files = [(f"data{i}", file_tuple) for i, file_tuple in enumerate(processed)]
+            finish_stage("preprocess")
+            report = client.upload_psychometric_data(form_data, files, cache_key=cache_key)
+        finish_stage("upload")
+
+        career = None
+        if run_career:
+            student_info = report.student_info or form_data
+            career = client.request_career_analysis(build_career_request(student_info, report))
+            finish_stage("career")
+
+        if run_export:
+            export = client.request_google_export({
+                "psychometricData": report.to_dict(),
+                "careerData": career.to_dict() if career else None
+            })
+            result["documentUrl"] = export.get("documentUrl")
+            finish_stage("export")
+
+        result["status"] = "completed"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["timings"]["total"] = round(sum(result["timings"].values()), 3)
+    return result
+
+def client_for(base_url):
+    """The app's n8n_client, or a client with its own caches for another base URL"""
+    if not base_url or base_url.rstrip("/") == settings.N8N_BASE_URL.rstrip("/"):
+        return n8n_client
+    folder = f"batch-{hashlib.sha256(base_url.rstrip('/').encode()).hexdigest()[:12]}"
+    settings.CACHE_DIR = os.path.join(settings.CACHE_DIR, folder)
+    return N8NClient(base_url=base_url)
+
+def run(roster_path, screenshots_dir, concurrency, checkpoint_path, manifest_path, run_career=True, run_export=True,
+        base_url=None):
+    """
+    Process a roster with bounded concurrency, resuming from the checkpoint
+
+    Returns:
+        list: Manifest entries for every student in the roster
+    """
+    client = client_for(base_url)
+    students = read_roster(roster_path)
+    checkpoint = Checkpoint(checkpoint_path)
+    pending = [student for student in students if student["student_id"] not in checkpoint.completed]
+    print(f"{len(students)} students, {len(students) - len(pending)} already done, {len(pending)} to process")
+
+    results = dict(checkpoint.completed)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+        futures = {
+            executor.submit(process_student, client, student, screenshots_dir, run_career, run_export): student
+            for student in pending
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            checkpoint.record(result)
+            results[result["student_id"]] = result
+            print(f"[{done}/{len(pending)}] {result['name']}: {result['status']} in {result['timings']['total']}s"
+                  + (f" - {result['error']}" if result["error"] else ""))
+
+    manifest = [results[student["student_id"]] for student in students if student["student_id"] in results]
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    failed = sum(1 for entry in manifest if entry["status"] != "completed")
+    print(f"Finished in {time.perf_counter() - started:.1f}s - {len(manifest) - failed} completed, {failed} failed")
+    print(f"Manifest written to {manifest_path}")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Process a cohort roster through the n8n report pipeline")
+    parser.add_argument("roster", help="CSV with name, age, grade and optional student_id, folder columns")
+    parser.add_argument("screenshots", help="Directory with one sub-directory of screenshots per student")
+    parser.add_argument("--concurrency", type=int, default=4, help="Students processed at once")
+    parser.add_argument("--checkpoint", default="batch_checkpoint.jsonl", help="Resume file; finished students are skipped")
+    parser.add_argument("--manifest", default="batch_manifest.json", help="Per-student results with timings")
+    parser.add_argument("--skip-career", action="store_true", help="Stop after the psychometric report")
+    parser.add_argument("--skip-export", action="store_true", help="Do not export to Google Docs")
+    parser.add_argument("--base-url", default=None, help="Override the n8n webhook base URL")
+    args = parser.parse_args()
+
+    run(
+        args.roster,
+        args.screenshots,
+        args.concurrency,
+        args.checkpoint,
+        args.manifest,
+        run_career=not args.skip_career,
+        run_export=not args.skip_export,
+        base_url=args.base_url
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# scripts/benchmark_export.py
+# Compare the old Google export path (bare requests.post, new connection per
+# call, no timeout) with N8NClient.request_google_export (pooled keep-alive
+# session, timeouts, retry policy)
+#
+# Usage: python -m scripts.benchmark_export --calls 200 --concurrency 8
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from services.api_client import N8NClient
+from services.rate_limiter import AdmissionController, TokenBucket, ConcurrencyGovernor
+from scripts.mock_n8n_server import start_server
+from scripts.stress_test import percentile
+
+def count_connections(server):
+    """Count TCP connections the mock server accepts"""
+    counter = {"connections": 0}
+    lock = threading.Lock()
+    handler_setup = server.RequestHandlerClass.setup
+
+    def setup(handler):
+        with lock:
+            counter["connections"] += 1
+        handler_setup(handler)
+
+    server.RequestHandlerClass.setup = setup
+    return counter
+
+def export_payload(index):
+    """Distinct content per call so export records never short-circuit the request"""
+    return {"psychometricData": {"studentInfo": {"name": f"Bench-{index}"}}, "careerData": {"run": time.time()}}
+
+def bare_export(base_url):
+    """The previous component code path"""
+    def export(index):
+        response = requests.post(f"{base_url}{settings.GOOGLE_EXPORT_ENDPOINT}", json=export_payload(index))
+        response.raise_for_status()
+        return response.json()
+    return export
+
+def client_export(base_url):
+    """The consolidated path; admission control is opened up so only transport is compared"""
+    client = N8NClient(
+        base_url=base_url,
+        admission=AdmissionController(
+            TokenBucket(rate=1e6, capacity=1e6),
+            ConcurrencyGovernor({}, default_limit=1e6, default_service_time=0)
+        )
+    )
+    return lambda index: client.request_google_export(export_payload(index))
+
+def measure(label, export, calls, concurrency, counter):
+    """Run calls exports with the given concurrency and print latency figures"""
+    counter["connections"] = 0
+    timings = []
+
+    def timed(index):
+        started = time.perf_counter()
+        export(index)
+        timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(calls)))
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"  {label:<8} {calls / elapsed:7.1f} calls/s  p50={statistics.median(timings) * 1000:.1f}ms "
+        f"p95={percentile(timings, 95) * 1000:.1f}ms  connections={counter['connections']}"
+    )
+
+def run(calls, concurrency, latency):
+    """
+    Benchmark both export paths against the local mock server
+
+    Args:
+        calls (int): Exports per path
+        concurrency (int): Exports in flight at once
+        latency (float): Mock webhook latency in seconds
+    """
+    settings.CACHE_DIR = tempfile.mkdtemp(prefix="export-bench-")
+    server, base_url = start_server(latency=latency)
+    counter = count_connections(server)
+
+    print(f"Calls: {calls}  Concurrency: {concurrency}  Mock latency: {latency * 1000:.0f}ms")
+    measure("bare", bare_export(base_url), calls, concurrency, counter)
+    measure("client", client_export(base_url), calls, concurrency, counter)
+    server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bare and pooled Google export paths")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    run(args.calls, args.concurrency, args.latency)
+
+if __name__ == "__main__":
+    main()
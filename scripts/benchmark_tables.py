@@ -0,0 +1,77 @@
+# scripts/benchmark_tables.py
+# Compare the old read-only table path (DataFrame -> to_html -> three
+# str.replace passes) with the direct table_html renderer, both on a cold
+# cache and on reruns where the rows haven't changed
+#
+# Usage: python -m scripts.benchmark_tables --reruns 500
+
+import argparse
+import re
+import time
+import pandas as pd
+from components.psychometric_analysis import TEST_CONFIGS, TABLE_TAG, TH_TAG, TD_TAG, table_cells, table_html
+from services.models import Report, display_text
+from scripts.mock_n8n_server import sample_report
+
+def dataframe_table_html(config, rows):
+    """The previous render_read_only_table body, minus st.markdown"""
+    if config["key"] == "high5Data":
+        table_data = [[display_text(row.preference), display_text(row.domain), display_text(row.meaning)] for row in rows]
+        df = pd.DataFrame(table_data, columns=["Strength", "Domain", "Meaning"])
+    else:
+        table_data = [[display_text(row.preference), display_text(row.score), display_text(row.meaning)] for row in rows]
+        df = pd.DataFrame(table_data, columns=config["headers"])
+
+    html_table = df.to_html(index=False, escape=False)
+    html_table = html_table.replace('<td>', TD_TAG)
+    html_table = html_table.replace('<th>', TH_TAG)
+    return html_table.replace('<table border="1" class="dataframe">', TABLE_TAG)
+
+def direct_table_html(config, rows):
+    return table_html(tuple(config["headers"]), table_cells(config, rows))
+
+def sections(report):
+    return [(config, report.test_data[config["key"]]) for config in TEST_CONFIGS if report.test_data.get(config["key"])]
+
+def render_all(render, report_sections):
+    """One rerun of the report view: every section's table"""
+    return [render(config, rows) for config, rows in report_sections]
+
+def time_reruns(label, render, report_sections, reruns, before_each=None):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        if before_each:
+            before_each()
+        render_all(render, report_sections)
+    elapsed = time.perf_counter() - start
+    per_rerun = elapsed / reruns * 1000
+    print(f"  {label:<22} {per_rerun:8.3f} ms per rerun")
+    return per_rerun
+
+def same_markup(old, new):
+    """Equal once the whitespace pandas puts between tags is ignored"""
+    return re.sub(r">\s+<", "><", old).strip() == new
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark read-only table rendering")
+    parser.add_argument("--reruns", type=int, default=500, help="Report view reruns to time per path")
+    args = parser.parse_args()
+
+    report = Report.from_dict(sample_report("Jordan", "16", "11th grade"))
+    report_sections = sections(report)
+    identical = all(
+        same_markup(old, new)
+        for old, new in zip(render_all(dataframe_table_html, report_sections), render_all(direct_table_html, report_sections))
+    )
+    print(f"{len(report_sections)} tables, {sum(len(rows) for _, rows in report_sections)} rows; same markup: {identical}")
+
+    baseline = time_reruns("DataFrame.to_html", dataframe_table_html, report_sections, args.reruns)
+    cold = time_reruns("direct, cold cache", direct_table_html, report_sections, args.reruns, before_each=table_html.cache_clear)
+    table_html.cache_clear()
+    cached = time_reruns("direct, unchanged rows", direct_table_html, report_sections, args.reruns)
+
+    print(f"Speedup: {baseline / cold:.0f}x cold, {baseline / cached:.0f}x for unchanged rows")
+    raise SystemExit(0 if identical else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# scripts/check_compression.py
+# Prove compressed career analysis and export bodies survive the round trip,
+# and show how much upload bandwidth compression saves on a realistic report
+#
+# Usage: python -m scripts.check_compression
+
+import argparse
+import hashlib
+import tempfile
+import requests
+from config import settings
+from services.api_client import N8NClient
+from services.compression import encode_json_request
+from services.json_codec import dumps
+from services.models import Report, CareerAnalysis
+from services.payloads import build_career_request
+from scripts.mock_n8n_server import start_server, sample_report, sample_career_analysis
+
+def sample_documents():
+    """Career and export request bodies built from the sample payloads"""
+    report = Report.from_dict(sample_report("Avery", "15", "10th grade"))
+    career = CareerAnalysis.from_dict(sample_career_analysis()["reportData"]["careerAnalysis"])
+    return {
+        settings.CAREER_ANALYSIS_ENDPOINT: build_career_request(report.student_info, report),
+        settings.GOOGLE_EXPORT_ENDPOINT: {"psychometricData": report.to_dict(), "careerData": career.to_dict()}
+    }
+
+def check_round_trip(base_url, encoding):
+    """Send each document compressed and compare the server's digest of what it decoded"""
+    settings.REQUEST_COMPRESSION_ENCODING = encoding
+    ok = True
+    for endpoint, document in sample_documents().items():
+        body, headers = encode_json_request(document)
+        response = requests.post(f"{base_url}{endpoint}", data=body, headers=headers, timeout=10)
+        response.raise_for_status()
+        expected = hashlib.sha256(dumps(document)).hexdigest()
+        matched = response.headers.get("X-Request-Body-Sha256") == expected
+        ok = ok and matched
+        raw_size = len(dumps(document))
+        print(
+            f"  {encoding:<8} {endpoint:<24} {raw_size:>6} -> {len(body):>6} bytes "
+            f"({100 * (1 - len(body) / raw_size):.0f}% saved)  "
+            f"response {response.headers.get('Content-Encoding') or 'identity'}  "
+            f"{'round trip OK' if matched else 'DIGEST MISMATCH'}"
+        )
+    return ok
+
+def check_fallback(reject_status):
+    """A server that refuses compressed bodies gets plain ones on the same call"""
+    server, base_url = start_server(accept_compressed=False, reject_status=reject_status)
+    client = N8NClient(base_url=base_url)
+    documents = sample_documents()
+    career = client.request_career_analysis(documents[settings.CAREER_ANALYSIS_ENDPOINT], force_refresh=True)
+    server.shutdown()
+    ok = career is not None and not client.compress_requests
+    print(f"  {reject_status} fallback: {'plain bodies sent after refusal' if ok else 'FAILED'}")
+    return ok
+
+def main():
+    argparse.ArgumentParser(description="Check compressed webhook request bodies against the mock server").parse_args()
+    settings.CACHE_DIR = tempfile.mkdtemp(prefix="compression-check-")
+    # Off by default until the production webhooks are confirmed; the mock decodes it
+    settings.REQUEST_COMPRESSION_ENABLED = True
+
+    server, base_url = start_server()
+    results = [check_round_trip(base_url, encoding) for encoding in ("gzip", "deflate")]
+    server.shutdown()
+    results.extend(check_fallback(status) for status in (400, 415, 422))
+
+    print("All checks passed" if all(results) else "Some checks FAILED")
+    raise SystemExit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
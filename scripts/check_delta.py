@@ -0,0 +1,88 @@
+# scripts/check_delta.py
+# Prove edited career analysis and export requests go out as deltas, that the
+# mock server rebuilds the exact edited document, and that a server which lost
+# the base version gets the full document after a 409
+#
+# Usage: python -m scripts.check_delta
+
+import argparse
+import copy
+import tempfile
+from config import settings
+from services.api_client import N8NClient
+from services.delta import make_delta
+from services.json_codec import dumps
+from services.models import Report, CareerAnalysis
+from services.payloads import build_career_request
+from scripts.mock_n8n_server import start_server, sample_report, sample_career_analysis
+
+def sample_edit():
+    """An original report and career analysis, and copies with a few edited fields"""
+    report = Report.from_dict(sample_report("Avery", "15", "10th grade"))
+    career = CareerAnalysis.from_dict(sample_career_analysis()["reportData"]["careerAnalysis"])
+    edited_report, edited_career = copy.deepcopy(report), copy.deepcopy(career)
+    first_rows = next(rows for rows in edited_report.test_data.values() if rows)
+    first_rows[0].meaning = "Edited by the counsellor"
+    edited_report.insights[0].text = "Prefers hands-on, collaborative work"
+    edited_career.fields[0].description = "Edited field description"
+    return report, career, edited_report, edited_career
+
+def show_sizes(label, base, document):
+    full_size = len(dumps(document))
+    delta_size = len(dumps(make_delta(base, document)))
+    print(f"  {label:<8} full {full_size:>6} bytes  delta {delta_size:>5} bytes ({100 * (1 - delta_size / full_size):.0f}% saved)")
+
+def check_deltas():
+    """Send the originals, then the edits against them, and confirm the server rebuilt both"""
+    report, career, edited_report, edited_career = sample_edit()
+    base_request = build_career_request(report.student_info, report)
+    edited_request = build_career_request(edited_report.student_info, edited_report)
+    base_payload = {"psychometricData": report.to_dict(), "careerData": career.to_dict()}
+    edited_payload = {"psychometricData": edited_report.to_dict(), "careerData": edited_career.to_dict()}
+    show_sizes("career", base_request, edited_request)
+    show_sizes("export", base_payload, edited_payload)
+
+    server, base_url = start_server()
+    client = N8NClient(base_url=base_url)
+    client.request_career_analysis(base_request)
+    client.request_career_analysis(edited_request, base_request=base_request)
+    client.request_google_export(base_payload)
+    client.request_google_export(edited_payload, base_payload=base_payload)
+    applied = list(server.RequestHandlerClass.deltas_applied)
+    server.shutdown()
+
+    ok = len(applied) == 2
+    print(f"  delta bodies rebuilt by the server: {len(applied)} of 2 {'OK' if ok else 'FAILED'}")
+    return ok
+
+def check_unknown_base():
+    """A fresh server has never seen the base, so the client resends the full document"""
+    report, career, edited_report, edited_career = sample_edit()
+    base_request = build_career_request(report.student_info, report)
+    edited_request = build_career_request(edited_report.student_info, edited_report)
+
+    first_server, base_url = start_server()
+    client = N8NClient(base_url=base_url)
+    client.request_career_analysis(base_request, force_refresh=True)
+    first_server.shutdown()
+    server, client.base_url = start_server()
+    career = client.request_career_analysis(edited_request, force_refresh=True, base_request=base_request)
+    applied = list(server.RequestHandlerClass.deltas_applied)
+    server.shutdown()
+
+    ok = career is not None and not applied
+    print(f"  409 fallback: {'full document sent after unknown base' if ok else 'FAILED'}")
+    return ok
+
+def main():
+    argparse.ArgumentParser(description="Check delta request bodies against the mock server").parse_args()
+    settings.CACHE_DIR = tempfile.mkdtemp(prefix="delta-check-")
+    settings.DELTA_PAYLOADS_ENABLED = True
+
+    results = [check_deltas(), check_unknown_base()]
+
+    print("All checks passed" if all(results) else "Some checks FAILED")
+    raise SystemExit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
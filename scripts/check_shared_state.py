@@ -0,0 +1,139 @@
+# scripts/check_shared_state.py
+# Prove sessions and background jobs are visible across worker processes for
+# each session store backend: one "worker" runs a job and saves a session,
+# another with its own store and job runner reads them back. Also checks that
+# concurrent writes to one session's jobs and one student's index are not lost
+#
+# Usage: python -m scripts.check_shared_state
+
+import argparse
+import tempfile
+import threading
+import time
+from config import settings
+from services.job_runner import Job, JobRunner
+from services.models import Report
+from services.session_store import create_session_store
+from scripts.mock_n8n_server import sample_report
+from scripts.state_server import start_server
+
+def slow_report(job):
+    """Job that reports progress for a moment, then returns a Report"""
+    for step in range(1, 5):
+        job.update(progress=step * 20, message=f"Step {step} of 4")
+        time.sleep(0.3)
+    return Report.from_dict(sample_report("Robin", "13", "8th grade"))
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def check_backend(backend):
+    """Run the job and session checks with two independent store/runner pairs"""
+    owner_store, other_store = create_session_store(backend), create_session_store(backend)
+    owner, other = JobRunner(state_store=owner_store), JobRunner(state_store=other_store)
+    session_id = f"check-{backend}-{time.time_ns()}"
+
+    owner.submit(session_id, "report", slow_report)
+    seen_running = wait_for(lambda: (other.get(session_id, "report") or Job(session_id, "report")).progress >= 40)
+    duplicate = other.submit(session_id, "report", slow_report)
+    finished = wait_for(lambda: (other.get(session_id, "report") or Job(session_id, "report")).done)
+    job = other.get(session_id, "report")
+    result_ok = finished and job.status == Job.COMPLETED and job.result.student_info.get("name") == "Robin"
+
+    owner_store.save(session_id, student_name="Robin", form={"name": "Robin"}, report=job.result.to_dict())
+    record = other_store.load(session_id)
+    session_ok = record is not None and record["report"]["studentInfo"]["name"] == "Robin"
+    found = any(sid == session_id for sid, _ in other_store.find_by_student("robin"))
+
+    other.clear(session_id)
+    other_store.delete(session_id)
+    # The owner drops its finished copy once it sees the job was collected elsewhere
+    cleared = owner.get(session_id, "report") is None
+
+    ok = seen_running and duplicate.id == job.id and result_ok and session_ok and found and cleared
+    print(
+        f"  {backend:<7} progress seen: {seen_running}  no duplicate: {duplicate.id == job.id}  "
+        f"result: {result_ok}  session: {session_ok}  by student: {found}  cleared: {cleared}"
+    )
+    return ok
+
+def check_concurrent_writes(backend, writes=40):
+    """Two workers publishing different jobs of one session, and saving sessions of one student, lose nothing"""
+    stores = [create_session_store(backend), create_session_store(backend)]
+    session_id = f"check-race-{backend}-{time.time_ns()}"
+    student = f"Race {time.time_ns()}"
+
+    def publish(store, kind, index):
+        for step in range(writes):
+            store.save_job(session_id, kind, {"kind": kind, "step": step})
+        store.save(f"{session_id}-{index}", student_name=student, form={"name": student})
+
+    threads = [
+        threading.Thread(target=publish, args=(store, kind, index))
+        for index, (store, kind) in enumerate(zip(stores, ("career", "export")))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    jobs_ok = all((stores[0].load_job(session_id, kind) or {}).get("step") == writes - 1 for kind in ("career", "export"))
+    index_ok = len(stores[1].find_by_student(student)) == 2
+    stores[0].delete_jobs(session_id)
+    for index in range(2):
+        stores[0].delete(f"{session_id}-{index}")
+    print(f"  {backend:<7} concurrent job states kept: {jobs_ok}  student index kept: {index_ok}")
+    return jobs_ok and index_ok
+
+def check_clear_running_job():
+    """A job cleared while still running (New Assessment) never comes back with its result"""
+    results = []
+    for cleared_by in ("owner", "other worker"):
+        owner = JobRunner(state_store=create_session_store("sqlite"))
+        other = JobRunner(state_store=create_session_store("sqlite"))
+        session_id = f"check-clear-{time.time_ns()}"
+        job = owner.submit(session_id, "export", lambda job: (time.sleep(0.5), {"documentUrl": "old"})[1])
+        wait_for(lambda: job.status == Job.RUNNING)
+        (owner if cleared_by == "owner" else other).clear(session_id)
+        wait_for(lambda: job.done)
+        time.sleep(0.1)
+        ok = owner.get(session_id, "export") is None and other.get(session_id, "export") is None
+        print(f"  job cleared by {cleared_by} while running stays cleared: {ok}")
+        results.append(ok)
+    return all(results)
+
+def check_stale_job():
+    """A running job whose worker stopped publishing is reported as failed"""
+    store = create_session_store("sqlite")
+    job = Job("check-stale", "career")
+    job.status = Job.RUNNING
+    state = job.to_dict()
+    state["published_at"] -= settings.JOB_STALE_AFTER + 1
+    store.save_job("check-stale", "career", state)
+    seen = JobRunner(state_store=store).get("check-stale", "career")
+    store.delete_jobs("check-stale")
+    ok = seen is not None and seen.status == Job.FAILED
+    print(f"  stale running job reported as failed: {ok}")
+    return ok
+
+def main():
+    argparse.ArgumentParser(description="Check shared session and job state across workers").parse_args()
+    settings.CACHE_DIR = tempfile.mkdtemp(prefix="shared-state-check-")
+
+    server, settings.STATE_SERVER_URL = start_server()
+    results = [check_backend(backend) for backend in ("sqlite", "file", "server")]
+    results += [check_concurrent_writes(backend) for backend in ("sqlite", "file", "server")]
+    results.append(check_clear_running_job())
+    results.append(check_stale_job())
+    server.shutdown()
+
+    print("All checks passed" if all(results) else "Some checks FAILED")
+    raise SystemExit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# scripts/mock_n8n_server.py
+# Local stand-in for the n8n webhooks, used by the stress test and benchmarks.
+# Also implements the job protocol used by settings.USE_JOB_MODE:
+#   POST {PSYCHOMETRIC_JOB_ENDPOINT}        -> 202 {"jobId": ...}
+#   GET  {JOB_STATUS_ENDPOINT}/{jobId}?wait=N -> status, long-polled up to N seconds
+# and the per-image webhook used by settings.USE_PER_IMAGE_UPLOAD:
+#   POST {PSYCHOMETRIC_IMAGE_ENDPOINT}      -> one testData section + its insight
+# Career and export bodies may be deltas (settings.DELTA_PAYLOADS_ENABLED); an
+# unknown base is answered with 409.
+#
+# Usage: python -m scripts.mock_n8n_server --port 8765 --latency 0.5
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlparse, parse_qs
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from config import settings
+from services.compression import decompress
+from services.delta import DeltaApplyError, apply, is_delta, version_id
+
+# ─── SAMPLE PAYLOADS ──────────────────────────────
+def sample_report(name="Student", age="14", grade="9th grade"):
+    """Build a report payload shaped like the real psychometric webhook response"""
+    return {
+        "studentInfo": {"name": name, "age": age, "grade": grade},
+        "testData": {
+            "test16PersonalityData": [
+                {"preference": "Introverted", "score": "62%", "meaning": "Recharges through quiet reflection."},
+                {"preference": "Intuitive", "score": "71%", "meaning": "Focuses on patterns and possibilities."},
+                {"preference": "Thinking", "score": "55%", "meaning": "Weighs decisions through logic."},
+                {"preference": "Judging", "score": "58%", "meaning": "Prefers structure and plans."},
+                {"preference": "Assertive", "score": "60%", "meaning": "Self-assured and even-tempered."}
+            ],
+            "high5Data": [
+                {"preference": "Philomath", "domain": "Thinking", "meaning": "Loves learning for its own sake."},
+                {"preference": "Strategist", "domain": "Thinking", "meaning": "Finds the best route to a goal."},
+                {"preference": "Believer", "domain": "Feeling", "meaning": "Driven by strong values."},
+                {"preference": "Analyst", "domain": "Thinking", "meaning": "Breaks problems into parts."},
+                {"preference": "Focus Expert", "domain": "Doing", "meaning": "Stays on task until done."}
+            ],
+            "bigFiveData": [
+                {"preference": "Openness", "score": "78", "meaning": "Curious and imaginative."},
+                {"preference": "Conscientiousness", "score": "66", "meaning": "Organized and dependable."},
+                {"preference": "Extraversion", "score": "35", "meaning": "Reserved in large groups."},
+                {"preference": "Agreeableness", "score": "70", "meaning": "Cooperative and warm."},
+                {"preference": "Neuroticism", "score": "40", "meaning": "Generally calm under pressure."}
+            ],
+            "riasecData": [
+                {"preference": "Investigative", "score": "32", "meaning": "Enjoys research and analysis."},
+                {"preference": "Artistic", "score": "27", "meaning": "Values creative expression."},
+                {"preference": "Social", "score": "21", "meaning": "Likes helping others."}
+            ]
+        },
+        "insightLines": [
+            "INSIGHT: A reflective thinker who plans ahead.",
+            "INSIGHT: Strengths cluster around learning and strategy.",
+            "INSIGHT: High openness balanced by steady conscientiousness.",
+            "INSIGHT: Interests point toward research-driven work."
+        ]
+    }
+
+def sample_career_analysis():
+    """Build a career payload shaped like the real career analysis webhook response"""
+    return {
+        "reportData": {
+            "careerAnalysis": {
+                "userMessage": {"type": "success", "title": "Analysis complete", "message": "Career pathways generated."},
+                "summary": {
+                    "coreDriver": "Understanding how things work.",
+                    "personality": "Reflective, curious and structured.",
+                    "workStyle": "Independent deep work with clear goals.",
+                    "learningStyle": "Reading, experimenting and asking why."
+                },
+                "careerFields": {
+                    "field1": {
+                        "title": "Research & Science",
+                        "alignment": "High",
+                        "description": "Roles built around inquiry and evidence.",
+                        "spaces": [
+                            {"title": "Biomedical Research", "description": "Lab-based discovery work."},
+                            {"title": "Data Science", "description": "Finding patterns in data."}
+                        ],
+                        "lessAligned": [
+                            {"area": "Field Sales", "reason": "Heavy on constant social interaction."}
+                        ]
+                    }
+                }
+            }
+        }
+    }
+
+def parse_multipart(content_type, body):
+    """Split a multipart/form-data body into text fields and file parts"""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    fields, files = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if part.get_filename():
+            files[name] = (part.get_filename(), part.get_payload(decode=True))
+        else:
+            fields[name] = part.get_payload(decode=True).decode()
+    return fields, files
+
+# ─── REQUEST HANDLER ──────────────────────────────
+class MockN8NHandler(BaseHTTPRequestHandler):
+    """Serve the three n8n webhooks with configurable latency and failures"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, keep-alive
+    # clients stall ~40ms per call on Nagle plus delayed ACK
+    disable_nagle_algorithm = True
+    latency = 0.0
+    failure_rate = 0.0
+    accept_compressed = True  # False answers compressed request bodies with reject_status
+    reject_status = 415
+    jobs = None  # job_id -> status dict, shared by one server's handlers
+    jobs_changed = None  # threading.Condition notified on every job update
+    versions = None  # version_id -> career/export document, for rebuilding deltas
+    deltas_applied = None  # Versions rebuilt from delta bodies, in arrival order
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        # Digest of the decoded body, echoed back so clients can check the round trip
+        self.body_digest = None
+        encoding = self.headers.get("Content-Encoding")
+        if encoding and self.accept_compressed:
+            body = decompress(body, encoding)
+        if body:
+            self.body_digest = hashlib.sha256(body).hexdigest()
+        return body
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if getattr(self, "body_digest", None):
+            self.send_header("X-Request-Body-Sha256", self.body_digest)
+        if "gzip" in (self.headers.get("Accept-Encoding") or "") and len(body) >= 1024:
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # ─── JOB PROTOCOL ──────────────────────────────
+    def _update_job(self, job_id, **changes):
+        with self.jobs_changed:
+            self.jobs[job_id].update(changes)
+            self.jobs_changed.notify_all()
+
+    def _run_job(self, job_id, fields, files):
+        """Simulate n8n working through each test, publishing partial results"""
+        report = sample_report(fields.get("name", "Student"), fields.get("age", "14"), fields.get("grade", "9th grade"))
+        report["receivedFiles"] = len(files)
+        stages = list(report["testData"].items())
+        partial = {}
+
+        self._update_job(job_id, status="running", stage="Reading screenshots")
+        for index, (key, rows) in enumerate(stages, start=1):
+            time.sleep(self.latency / len(stages))
+            partial[key] = rows
+            self._update_job(
+                job_id,
+                progress=int(100 * index / (len(stages) + 1)),
+                stage=f"Analyzed {index} of {len(stages)} tests",
+                partial={"testData": dict(partial)}
+            )
+        self._update_job(job_id, status="completed", progress=100, stage="Report ready", result=report)
+
+    def _submit_job(self, body):
+        fields, files = parse_multipart(self.headers["Content-Type"], body)
+        job_id = uuid.uuid4().hex
+        with self.jobs_changed:
+            self.jobs[job_id] = {
+                "jobId": job_id, "status": "queued", "progress": 0, "stage": "Queued",
+                "partial": {}, "result": None, "error": None
+            }
+        threading.Thread(target=self._run_job, args=(job_id, fields, files), daemon=True).start()
+        self._send_json(202, {"jobId": job_id, "status": "queued"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        prefix = f"{settings.JOB_STATUS_ENDPOINT}/"
+        if prefix not in url.path:
+            self._send_json(404, {"error": f"Unknown webhook {url.path}"})
+            return
+
+        job_id = url.path.split(prefix, 1)[1]
+        wait = float(parse_qs(url.query).get("wait", ["0"])[0])
+        with self.jobs_changed:
+            job = self.jobs.get(job_id)
+            if job is None:
+                self._send_json(404, {"error": f"Unknown job {job_id}"})
+                return
+            # Long-poll: hold the request until the job changes or wait expires
+            seen = (job["status"], job["progress"])
+            deadline = time.monotonic() + wait
+            while (job["status"], job["progress"]) == seen and job["status"] not in ("completed", "failed"):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.jobs_changed.wait(remaining)
+            snapshot = dict(job)
+        self._send_json(200, snapshot)
+
+    def _rebuild_document(self, request):
+        """
+        Turn a delta body back into the full document and remember every version seen
+
+        Answers 409 for an unknown base and 422 when the rebuilt document does
+        not match the version the client declared, returning None in both cases.
+        """
+        if is_delta(request):
+            base = self.versions.get(request["baseVersion"])
+            if base is None:
+                self._send_json(409, {"error": "Unknown base version"})
+                return None
+            try:
+                document = apply(base, request["changes"])
+            except DeltaApplyError as e:
+                self._send_json(422, {"error": str(e)})
+                return None
+            if version_id(document) != request.get("version"):
+                self._send_json(422, {"error": "Rebuilt document does not match its version"})
+                return None
+            self.deltas_applied.append(request["version"])
+        else:
+            document = request
+        self.versions[version_id(document)] = document
+        return document
+
+    def do_POST(self):
+        if self.headers.get("Content-Encoding") and not self.accept_compressed:
+            self._read_body()
+            self._send_json(self.reject_status, {"error": "Compressed request bodies are not supported"})
+            return
+        body = self._read_body()
+        if self.path.endswith(settings.PSYCHOMETRIC_JOB_ENDPOINT):
+            self._submit_job(body)
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            self._send_json(503, {"error": "Simulated n8n overload"})
+            return
+
+        if self.path.endswith(settings.PSYCHOMETRIC_IMAGE_ENDPOINT):
+            # One screenshot holds one test: answer with that section and its insight
+            fields, files = parse_multipart(self.headers["Content-Type"], body)
+            report = sample_report(fields.get("name", "Student"), fields.get("age", "14"), fields.get("grade", "9th grade"))
+            index = int(fields.get("imageIndex", "0")) % len(settings.TEST_DATA_KEYS)
+            key = settings.TEST_DATA_KEYS[index]
+            self._send_json(200, [{
+                "studentInfo": report["studentInfo"],
+                "testData": {key: report["testData"][key]},
+                "insightLines": [report["insightLines"][index]]
+            }])
+        elif self.path.endswith(settings.PSYCHOMETRIC_UPLOAD_ENDPOINT):
+            fields, files = parse_multipart(self.headers["Content-Type"], body)
+            report = sample_report(fields.get("name", "Student"), fields.get("age", "14"), fields.get("grade", "9th grade"))
+            report["receivedFiles"] = len(files)
+            self._send_json(200, [report])
+        elif self.path.endswith(settings.CAREER_ANALYSIS_ENDPOINT):
+            request = self._rebuild_document(json.loads(body))
+            if request is None:
+                return
+            career = sample_career_analysis()
+            career["reportData"]["careerAnalysis"]["echo"] = request.get("studentInfo")
+            self._send_json(200, [career])
+        elif self.path.endswith(settings.GOOGLE_EXPORT_ENDPOINT):
+            request = self._rebuild_document(json.loads(body))
+            if request is None:
+                return
+            name = request.get("psychometricData", {}).get("studentInfo", {}).get("name", "Student")
+            self._send_json(200, [{"success": True, "documentUrl": f"https://docs.google.com/document/d/mock-{name}"}])
+        else:
+            self._send_json(404, {"error": f"Unknown webhook {self.path}"})
+
+def start_server(port=0, latency=0.0, failure_rate=0.0, accept_compressed=True, reject_status=415):
+    """
+    Start the mock server on a daemon thread
+
+    Args:
+        port (int): Port to bind on localhost, 0 picks a free port
+        latency (float): Seconds each webhook call sleeps before answering
+        failure_rate (float): Fraction of calls answered with HTTP 503
+        accept_compressed (bool): Decode gzip/deflate request bodies, else answer reject_status
+        reject_status (int): Status for refused compressed bodies
+
+    Returns:
+        tuple: (server, base_url) - call server.shutdown() to stop it
+    """
+    handler = type("ConfiguredMockN8NHandler", (MockN8NHandler,), {
+        "latency": latency,
+        "failure_rate": failure_rate,
+        "accept_compressed": accept_compressed,
+        "reject_status": reject_status,
+        "jobs": {},
+        "versions": {},
+        "deltas_applied": [],
+        "jobs_changed": threading.Condition()
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the n8n webhooks")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.port, args.latency, args.failure_rate)
+    print(f"Mock n8n webhooks listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# scripts/state_server.py
+# Local stand-in for a shared key-value service (Redis or similar) so several
+# Streamlit worker processes can share sessions and job state with
+# SESSION_STORE_BACKEND = "server":
+#   GET    /kv/{key} -> 200 JSON value with its version as ETag, or 404
+#   PUT    /kv/{key} -> 204, stores the JSON request body
+#   DELETE /kv/{key} -> 204, or 404
+# PUT and DELETE honour If-Match: "<version>" and If-None-Match: * and answer
+# 412 when the stored value changed, so clients can compare-and-set.
+#
+# Usage: python -m scripts.state_server --port 8766
+#        streamlit run app.py --server.port 8501   (and 8502, ... behind a load balancer)
+
+import argparse
+import itertools
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class KeyValueHandler(BaseHTTPRequestHandler):
+    """In-memory JSON values by key, shared by one server's handlers"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    values = None  # key -> (version, serialized JSON bytes)
+    lock = None
+    next_version = None  # itertools.count shared by the server's handlers
+
+    def log_message(self, format, *args):
+        pass
+
+    def _key(self):
+        prefix = "/kv/"
+        if not self.path.startswith(prefix) or len(self.path) == len(prefix):
+            self._send(404, b'{"error": "Unknown path"}')
+            return None
+        return self.path[len(prefix):]
+
+    def _precondition_holds(self, key):
+        """Check If-Match/If-None-Match against the stored version; call with the lock held"""
+        stored = self.values.get(key)
+        if_match = self.headers.get("If-Match")
+        if if_match is not None and (stored is None or if_match != f'"{stored[0]}"'):
+            return False
+        return not (self.headers.get("If-None-Match") == "*" and stored is not None)
+
+    def _send(self, status, body=b"", etag=None):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        if body:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        key = self._key()
+        if key is None:
+            return
+        with self.lock:
+            stored = self.values.get(key)
+        if stored is None:
+            self._send(404, b'{"error": "Not found"}')
+        else:
+            self._send(200, stored[1], etag=f'"{stored[0]}"')
+
+    def do_PUT(self):
+        key = self._key()
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if key is None:
+            return
+        try:
+            json.loads(body)
+        except ValueError:
+            self._send(400, b'{"error": "Body is not JSON"}')
+            return
+        with self.lock:
+            allowed = self._precondition_holds(key)
+            if allowed:
+                self.values[key] = (next(self.next_version), body)
+        if allowed:
+            self._send(204)
+        else:
+            self._send(412, b'{"error": "Value changed"}')
+
+    def do_DELETE(self):
+        key = self._key()
+        if key is None:
+            return
+        with self.lock:
+            allowed = self._precondition_holds(key)
+            existed = allowed and self.values.pop(key, None) is not None
+        if not allowed:
+            self._send(412, b'{"error": "Value changed"}')
+        else:
+            self._send(204 if existed else 404)
+
+def start_server(port=0):
+    """
+    Start the key-value server on a daemon thread
+
+    Args:
+        port (int): Port to bind on localhost, 0 picks a free port
+
+    Returns:
+        tuple: (server, base_url) - call server.shutdown() to stop it
+    """
+    handler = type("ConfiguredKeyValueHandler", (KeyValueHandler,), {
+        "values": {},
+        "lock": threading.Lock(),
+        "next_version": itertools.count(1)
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local key-value server for shared session state")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.port)
+    print(f"Session state server listening on {base_url} (set STATE_SERVER_URL to this)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# scripts/stress_test.py
+# Drive N simulated Streamlit sessions against one shared N8NClient, built the
+# way the n8n_client singleton is but with its caches in a temp directory, so
+# every call reaches the server instead of the app's real result caches.
+# Admission control is opened up unless --respect-limits is given, so the
+# figures measure the client and server rather than the rate limiter.
+# --async runs the sessions as coroutines on one event loop through
+# AsyncN8NClient instead of one thread per session
+#
+# Usage: python -m scripts.stress_test --sessions 50 --rounds 5 --latency 0.2 [--async]
+
+import argparse
+import asyncio
+import io
+import statistics
+import tempfile
+import threading
+import time
+from config import settings
+from services.api_client import N8NClient
+from services.async_api_client import AsyncN8NClient
+from services.rate_limiter import AdmissionController, TokenBucket, ConcurrencyGovernor
+from scripts.mock_n8n_server import start_server
+
+def session_steps(client, name):
+    """The upload -> career analysis -> export calls one session round makes, for either client"""
+    return [
+        ("upload", lambda: client.upload_psychometric_data(
+            {"name": name, "age": "14", "grade": "9th grade", "fileCount": "1"},
+            [("data0", ("shot.png", io.BytesIO(b"\x89PNG" + b"0" * 2048), "image/png"))]
+        )),
+        ("career", lambda: client.request_career_analysis(
+            {"studentInfo": {"name": name, "age": "14", "grade": "9th grade"}, "editedTestData": {}, "editedInsights": []}
+        )),
+        ("export", lambda: client.request_google_export(
+            {"psychometricData": {"studentInfo": {"name": name}}, "careerData": {}}
+        ))
+    ]
+
+def check_result(step, result, name):
+    """Responses must belong to this session, otherwise state leaked across sessions"""
+    if step == "upload" and result.student_info["name"] != name:
+        return "cross-session response"
+    if step == "career" and result.extras["echo"]["name"] != name:
+        return "cross-session response"
+    if step == "export" and not result["documentUrl"].endswith(name):
+        return "cross-session response"
+    return None
+
+def simulate_session(client, session_index, rounds, results, lock):
+    """Run the upload -> career analysis -> export sequence one session would"""
+
+    for round_index in range(rounds):
+        name = f"Student-{session_index}-{round_index}"
+        for step, call in session_steps(client, name):
+            started = time.perf_counter()
+            try:
+                error = check_result(step, call(), name)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+
+            with lock:
+                results.append((step, time.perf_counter() - started, error))
+
+async def simulate_session_async(client, session_index, rounds, results):
+    """simulate_session as a coroutine, awaiting an AsyncN8NClient"""
+
+    for round_index in range(rounds):
+        name = f"Student-{session_index}-{round_index}"
+        for step, call in session_steps(client, name):
+            started = time.perf_counter()
+            try:
+                error = check_result(step, await call(), name)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            results.append((step, time.perf_counter() - started, error))
+
+async def run_async_sessions(client, sessions, rounds, results):
+    async with AsyncN8NClient(client) as async_client:
+        await asyncio.gather(*(simulate_session_async(async_client, i, rounds, results) for i in range(sessions)))
+
+def percentile(values, pct):
+    """Return the pct percentile of values (nearest rank)"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def run(sessions, rounds, latency, failure_rate, base_url=None, respect_limits=False, use_async=False):
+    """
+    Run the stress test and print a throughput and error report
+
+    Args:
+        sessions (int): Number of concurrent simulated sessions
+        rounds (int): Upload/career/export sequences per session
+        latency (float): Mock webhook latency in seconds
+        failure_rate (float): Fraction of mock calls that return 503
+        base_url (str): Point at an existing server instead of the local mock
+        respect_limits (bool): Keep the app's rate limit and per-endpoint concurrency caps
+        use_async (bool): Gather the sessions on an event loop through AsyncN8NClient
+
+    Returns:
+        list: (step, seconds, error) tuples for every call made
+    """
+
+    server = None
+    if base_url is None:
+        server, base_url = start_server(latency=latency, failure_rate=failure_rate)
+    settings.CACHE_DIR = tempfile.mkdtemp(prefix="stress-test-")
+    admission = None
+    if not respect_limits:
+        admission = AdmissionController(
+            TokenBucket(rate=1e6, capacity=1e6),
+            ConcurrencyGovernor({}, default_limit=1e6, default_service_time=0)
+        )
+    client = N8NClient(base_url=base_url, admission=admission)
+
+    results, lock = [], threading.Lock()
+    started = time.perf_counter()
+    if use_async:
+        asyncio.run(run_async_sessions(client, sessions, rounds, results))
+    else:
+        threads = [
+            threading.Thread(target=simulate_session, args=(client, i, rounds, results, lock))
+            for i in range(sessions)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    if server:
+        server.shutdown()
+
+    print(f"Mode: {'async' if use_async else 'threads'}  Sessions: {sessions}  Rounds: {rounds}  Calls: {len(results)}  Wall time: {elapsed:.2f}s")
+    print(f"Throughput: {len(results) / elapsed:.1f} calls/s")
+    for step in ("upload", "career", "export"):
+        timings = [seconds for name, seconds, _ in results if name == step]
+        errors = [error for name, _, error in results if name == step and error]
+        if timings:
+            print(
+                f"  {step:<7} n={len(timings):<5} p50={statistics.median(timings) * 1000:.0f}ms "
+                f"p95={percentile(timings, 95) * 1000:.0f}ms errors={len(errors)}"
+            )
+
+    distinct_errors = {error for _, _, error in results if error}
+    for error in sorted(distinct_errors):
+        print(f"  error: {error}")
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test a shared n8n client")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--base-url", default=None, help="Use a running server instead of the local mock")
+    parser.add_argument("--respect-limits", action="store_true", help="Keep the app's rate limit and concurrency caps")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Drive the sessions through AsyncN8NClient")
+    args = parser.parse_args()
+
+    run(args.sessions, args.rounds, args.latency, args.failure_rate, args.base_url, args.respect_limits, args.use_async)
+
+if __name__ == "__main__":
+    main()
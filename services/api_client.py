@@ -1,147 +1,648 @@
-import requests
+import copy
+import os
+import threading
 import time
-import streamlit as st
+import requests
+from concurrent.futures import ThreadPoolExecutor, Future
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from config import settings
+from services.retry import RetryEngine, CircuitOpenError
+from services.rate_limiter import AdmissionController, AdmissionTimeoutError
+from services.hedging import Hedger
+from services.multipart import MultipartStream
+from services.cache import LRUCache, DiskCache, TieredCache, hash_upload, canonical_hash
+from services.payloads import merge_image_reports
+from services.models import Report, CareerAnalysis
+from services.compression import ACCEPT_ENCODING, COMPRESSION_REJECTED_STATUSES, encode_json_request
+from services.json_codec import read_json, dumps
+from services.delta import VersionRegistry, make_delta, version_id
 
-class N8NClient:
-    """Client for communicating with N8N webhooks"""
+USER_AGENT = 'StreamlitApp/1.0'
+
+def unwrap_payload(payload):
+    """Unwrap the single-item list n8n returns from its webhook nodes"""
+    if isinstance(payload, list) and payload:
+        return payload[0]
+    return payload
+
+def extract_career_analysis(career_data):
+    """Extract the career analysis from the n8n response structure"""
+    if career_data.get("reportData") and career_data["reportData"].get("careerAnalysis"):
+        return career_data["reportData"]["careerAnalysis"]
+    # Fallback to direct structure
+    return career_data
+
+def export_idempotency_key(payload):
+    """
+    Idempotency key for a Google Docs export, from the exact report and career content
+
+    Not normalized: an edit that only changes whitespace or line breaks
+    still shows up in the document, so it must export again.
+    """
+    return version_id({
+        "psychometricData": payload.get("psychometricData"),
+        "careerData": payload.get("careerData")
+    })
+
+class JobFailedError(Exception):
+    """Raised when a submitted analysis job fails or does not finish in time"""
+
+class SingleFlight:
+    """
+    Share one in-flight call between concurrent callers with the same key
+    
+    The first caller runs the function; callers arriving before it finishes
+    wait for and receive the same result (or exception) instead of starting
+    a duplicate n8n execution. Unlike the result caches nothing is kept once
+    the call completes.
+    """
     
     def __init__(self):
-        self.base_url = "https://techbh.app.n8n.cloud/webhook"
+        self._calls = {}  # key -> Future of the in-flight call
+        self._lock = threading.Lock()
+        self.coalesced = 0  # Callers that joined another caller's request
+    
+    def do(self, key, func):
+        """
+        Run func() unless an identical call is already in flight, then share its outcome
+        
+        Args:
+            key (hashable): Request fingerprint
+            func (callable): Performs the request
+        
+        Returns:
+            The call's result; joining callers get their own copy so they can edit it
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            return copy.deepcopy(future.result())
+        
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+class N8NClient:
+    """
+    Client for communicating with N8N webhooks
+    
+    A single instance is shared by every Streamlit session in the process, so
+    the session object is never mutated after construction: headers are passed
+    per request and cookies are refused so nothing leaks between sessions.
+    """
+    
+    def __init__(self, base_url=None, pool_size=None, retry=None, admission=None):
+        self.base_url = base_url or settings.N8N_BASE_URL
+        self.retry = retry or RetryEngine()
+        # Rate limit and per-endpoint concurrency caps shared by every session
+        self.admission = admission or AdmissionController()
         self.session = requests.Session()
         self.session.trust_env = False
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
         self.session.headers.update({
-            'User-Agent': 'StreamlitApp/1.0',
-            'Connection': 'close'
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': ACCEPT_ENCODING
         })
+        # Cleared if the webhooks answer a compressed body with 415
+        self.compress_requests = True
+        # "endpoint version" pairs the webhooks hold, usable as delta bases
+        self.known_versions = VersionRegistry()
+        
+        # Reuse keep-alive connections instead of a new TCP/TLS handshake per call.
+        # Size the pool to the number of concurrent sessions expected per process.
+        adapter = HTTPAdapter(
+            pool_connections=settings.POOL_MAX_CONNECTIONS,
+            pool_maxsize=pool_size or settings.POOL_MAX_PER_HOST
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Identical resubmissions are answered from here instead of re-running n8n
+        self.upload_cache = TieredCache(
+            LRUCache(settings.UPLOAD_CACHE_MEMORY_ENTRIES, ttl=settings.UPLOAD_CACHE_TTL),
+            DiskCache(
+                os.path.join(settings.CACHE_DIR, "uploads"),
+                ttl=settings.UPLOAD_CACHE_TTL,
+                max_bytes=settings.UPLOAD_CACHE_MAX_BYTES
+            )
+        )
+        self.career_cache = TieredCache(
+            LRUCache(settings.CAREER_CACHE_MEMORY_ENTRIES, ttl=settings.CAREER_CACHE_TTL),
+            DiskCache(
+                os.path.join(settings.CACHE_DIR, "career"),
+                ttl=settings.CAREER_CACHE_TTL,
+                max_bytes=settings.CAREER_CACHE_MAX_BYTES
+            )
+        )
+        
+        # Concurrent identical career and export calls share one request
+        self.inflight = SingleFlight()
+        
+        # Backup requests for slow career analyses (settings.CAREER_HEDGING_ENABLED)
+        self.career_hedger = Hedger()
+        
+        # Idempotency key -> export result, so unchanged content is exported once
+        self.export_records = DiskCache(
+            os.path.join(settings.CACHE_DIR, "exports"),
+            ttl=settings.EXPORT_RECORD_TTL
+        )
     
-    def upload_psychometric_data(self, form_data, files, max_retries=3):
+    def request(self, method, endpoint, read_timeout, on_retry=None, max_attempts=None,
+                on_wait=None, admission_key=None, json_response=False, retry_unsafe=True, on_admitted=None,
+                **kwargs):
+        """
+        Call an n8n webhook through admission control and the shared retry engine
+        
+        Each attempt, retries included, waits for a concurrency slot on its
+        endpoint and a token from the process-wide rate limiter.
+        
+        Args:
+            method (str): HTTP method
+            endpoint (str): Webhook path, e.g. settings.CAREER_ANALYSIS_ENDPOINT
+            read_timeout (int): Read timeout in seconds
+            on_retry (callable): Called with (attempt, delay, error) before each retry
+            max_attempts (int): Override the retry policy's attempt limit
+            on_wait (callable): Called with the estimated seconds left while the call is queued
+            admission_key (str): Concurrency bucket, defaults to the endpoint
+            json_response (bool): Stream the body within settings.MAX_RESPONSE_BYTES and
+                                  return it decoded, as part of the attempt
+            retry_unsafe (bool): False for calls that must not run twice, so a timeout
+                                 or 502/504 after the body was sent is not retried
+            on_admitted (callable): Called each time an attempt leaves the admission queue
+            **kwargs: Passed to requests.Session.request; file objects and streamed
+                      bodies are rewound per attempt
+        
+        Returns:
+            requests.Response: Successful (2xx) response, or its decoded JSON body
+        """
+        
+        def attempt():
+            # Reset files for retry (files might be consumed)
+            for file_tuple in kwargs.get('files') or []:
+                content = file_tuple[1][1]
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+            if hasattr(kwargs.get('data'), 'rewind'):
+                kwargs['data'].rewind()
+            
+            with self.admission.admit(admission_key or endpoint, on_wait=on_wait, on_admitted=on_admitted):
+                response = self.session.request(
+                    method,
+                    f"{self.base_url}{endpoint}",
+                    timeout=(settings.CONNECTION_TIMEOUT, read_timeout),
+                    stream=json_response,
+                    **kwargs
+                )
+                if not json_response:
+                    response.raise_for_status()
+                    return response
+                if not response.ok:
+                    response.close()
+                    response.raise_for_status()
+                return read_json(response, admission_key or endpoint)
+        
+        return self.retry.call(attempt, max_attempts=max_attempts, on_retry=on_retry, retry_unsafe=retry_unsafe)
+    
+    def post(self, endpoint, read_timeout, **kwargs):
+        """POST to an n8n webhook through the shared retry engine"""
+        return self.request('POST', endpoint, read_timeout, **kwargs)
+    
+    def get(self, endpoint, read_timeout, **kwargs):
+        """GET from an n8n webhook through the shared retry engine"""
+        return self.request('GET', endpoint, read_timeout, **kwargs)
+    
+    def post_json(self, endpoint, read_timeout, **kwargs):
+        """POST to an n8n webhook and return its size-checked, decoded JSON body"""
+        return self.request('POST', endpoint, read_timeout, json_response=True, **kwargs)
+    
+    def get_json(self, endpoint, read_timeout, **kwargs):
+        """GET from an n8n webhook and return its size-checked, decoded JSON body"""
+        return self.request('GET', endpoint, read_timeout, json_response=True, **kwargs)
+    
+    def post_json_document(self, endpoint, read_timeout, document, headers=None, base_document=None, **kwargs):
+        """
+        POST a JSON document, as a delta against base_document when the server holds it
+        
+        With settings.DELTA_PAYLOADS_ENABLED, a document whose base version was
+        sent to this endpoint before goes out as {"baseVersion", "version",
+        "changes"}; a 409 (base unknown to the server) falls back to the full
+        document. Bodies are compressed above settings.REQUEST_COMPRESSION_MIN_BYTES.
+        
+        Args:
+            endpoint (str): Webhook path
+            read_timeout (int): Read timeout in seconds
+            document: JSON-serializable request body
+            headers (dict): Extra request headers
+            base_document: Unedited version of document, e.g. built from the original report
+            **kwargs: Passed to request()
+        
+        Returns:
+            The decoded JSON response
+        """
+        
+        if not settings.DELTA_PAYLOADS_ENABLED:
+            return self._post_encoded(endpoint, read_timeout, document, headers, **kwargs)
+        
+        if base_document is not None:
+            base_key = f"{endpoint} {version_id(base_document)}"
+            if base_key in self.known_versions:
+                delta = make_delta(base_document, document)
+                if len(dumps(delta)) < len(dumps(document)):
+                    try:
+                        result = self._post_encoded(endpoint, read_timeout, delta, headers, **kwargs)
+                    except requests.exceptions.HTTPError as e:
+                        if e.response is None or e.response.status_code != 409:
+                            raise
+                        # The server no longer has the base; send everything below
+                        self.known_versions.discard(base_key)
+                    else:
+                        self.known_versions.add(f"{endpoint} {delta['version']}")
+                        return result
+        
+        result = self._post_encoded(endpoint, read_timeout, document, headers, **kwargs)
+        self.known_versions.add(f"{endpoint} {version_id(document)}")
+        return result
+    
+    def _post_encoded(self, endpoint, read_timeout, document, headers=None, **kwargs):
+        """POST a JSON body, compressed when large enough and the server accepts it"""
+        
+        body, body_headers = encode_json_request(document, compress_body=self.compress_requests)
+        try:
+            return self.post_json(endpoint, read_timeout, data=body, headers=dict(body_headers, **(headers or {})), **kwargs)
+        except requests.exceptions.HTTPError as e:
+            if 'Content-Encoding' not in body_headers or e.response is None or e.response.status_code not in COMPRESSION_REJECTED_STATUSES:
+                raise
+            # Webhooks that can't read compressed bodies don't all answer 415;
+            # retry plain and only stop compressing if the plain body goes through
+            body, body_headers = encode_json_request(document, compress_body=False)
+            result = self.post_json(endpoint, read_timeout, data=body, headers=dict(body_headers, **(headers or {})), **kwargs)
+            self.compress_requests = False
+            return result
+    
+    def estimate_wait(self, endpoint):
+        """Seconds a call to this endpoint would currently queue before starting"""
+        return self.admission.estimate_wait(endpoint)
+    
+    def cached_report(self, cache_key):
+        """
+        Report cached for an upload, or None
+
+        Args:
+            cache_key (str): hash_upload() of the form data and the files as uploaded,
+                             so a repeat submission is answered before any preprocessing
+        """
+        cached = self.upload_cache.get(cache_key)
+        return Report.from_dict(cached) if cached is not None else None
+    
+    def upload_psychometric_data(self, form_data, files, max_retries=None, on_retry=None,
+                                 progress_callback=None, use_cache=True, on_job_status=None, on_wait=None,
+                                 cache_key=None):
         """
         Upload form data and files to psychometric analysis webhook
         
+        The multipart body is streamed in chunks from the file objects, so
+        pass the uploaded files themselves rather than their bytes. Results are
+        cached by a hash of the image bytes plus name, age and grade. With
+        settings.USE_PER_IMAGE_UPLOAD each screenshot is analyzed concurrently;
+        with settings.USE_JOB_MODE the upload is submitted as a job and polled
+        instead of holding one request open for the whole analysis.
+        
         Args:
             form_data (dict): Form data with name, age, grade, fileCount
             files (list): List of file tuples for upload
-            max_retries (int): Maximum retry attempts
+            max_retries (int): Maximum attempts, defaults to settings.MAX_RETRIES
+            on_retry (callable): Called with (attempt, delay, error) before each retry
+            progress_callback (callable): Called with (bytes_sent, total_bytes)
+            use_cache (bool): Return a cached report for an identical upload
+            on_job_status (callable): Job mode only, called with each status dict
+            on_wait (callable): Called with the estimated seconds left while queued for a slot
+            cache_key (str): Cache the report under this key (see cached_report()) instead
+                             of a hash of files, e.g. when files were preprocessed
         
         Returns:
-            dict: Parsed response from webhook
+            Report: Validated report parsed from the webhook response
         """
         
-        retry_count = 0
+        if use_cache:
+            cache_key = cache_key or hash_upload(form_data, files)
+            cached = self.cached_report(cache_key)
+            if cached is not None:
+                return cached
+        else:
+            cache_key = None
         
-        while retry_count < max_retries:
-            try:
-                response = self.session.post(
-                    f"{self.base_url}/google-report-upload",
-                    data=form_data,
-                    files=files,
-                    timeout=(30, 180),  # (connection timeout, read timeout)
-                    stream=False
-                )
-                response.raise_for_status()
-                
-                # Parse JSON response
-                try:
-                    payload = response.json()
-                except ValueError:
-                    text_response = response.text
-                    raise Exception(f"Invalid JSON response: {text_response[:500]}...")
-                
-                # Validate response
-                if not payload:
-                    raise Exception("Empty response received from server")
-                
-                # Unwrap list response if needed
-                if isinstance(payload, list) and payload:
-                    payload = payload[0]
-                
-                return payload
-                
-            except (requests.exceptions.ConnectionError, 
-                    requests.exceptions.ChunkedEncodingError,
-                    requests.exceptions.Timeout) as e:
-                retry_count += 1
-                if retry_count < max_retries:
-                    st.write(f"Connection issue, retrying... (attempt {retry_count + 1})")
-                    time.sleep(2)  # Wait before retry
-                    # Reset files for retry (files might be consumed)
-                    for file_tuple in files:
-                        if hasattr(file_tuple[1], 'seek'):
-                            file_tuple[1].seek(0)
-                else:
-                    raise e
-    
-    def request_career_analysis(self, career_request_data):
+        if settings.USE_PER_IMAGE_UPLOAD:
+            payload = self.upload_psychometric_images(
+                form_data,
+                files,
+                on_retry=on_retry,
+                progress_callback=progress_callback,
+                on_wait=on_wait
+            )
+        elif settings.USE_JOB_MODE:
+            job_id = self.submit_psychometric_job(
+                form_data,
+                files,
+                on_retry=on_retry,
+                progress_callback=progress_callback,
+                on_wait=on_wait
+            )
+            payload = self.wait_for_job(job_id, on_status=on_job_status)
+        else:
+            body = MultipartStream(form_data, files, progress_callback=progress_callback)
+            payload = self.post_json(
+                settings.PSYCHOMETRIC_UPLOAD_ENDPOINT,
+                settings.READ_TIMEOUT,
+                on_retry=on_retry,
+                max_attempts=max_retries,
+                on_wait=on_wait,
+                data=body,
+                headers={'Content-Type': body.content_type}
+            )
+        
+        # Validate response
+        if not payload:
+            raise Exception("Empty response received from server")
+        
+        # Unwrap list response if needed, then validate it once here
+        payload = unwrap_payload(payload)
+        report = Report.from_dict(payload)
+        if cache_key:
+            self.upload_cache.set(cache_key, payload)
+        return report
+    
+    # ─── PER-IMAGE MODE ──────────────────────────────
+    def upload_psychometric_images(self, form_data, files, on_retry=None, progress_callback=None, on_wait=None):
+        """
+        Analyze every screenshot in its own concurrent request and merge the results
+        
+        Wall-clock time is roughly that of the slowest single image instead of
+        the whole set uploaded and analyzed in sequence.
+        
+        Args:
+            form_data (dict): Form data with name, age, grade
+            files (list): List of file tuples for upload
+            on_retry (callable): Called with (attempt, delay, error) before each retry
+            progress_callback (callable): Called with (bytes_sent, total_bytes) across all images
+            on_wait (callable): Called with the estimated seconds left while an image is queued
+        
+        Returns:
+            dict: Merged payload shaped like the single-upload response
+        """
+        
+        bodies = []
+        for index, (_, file_tuple) in enumerate(files):
+            fields = dict(form_data, fileCount="1", imageIndex=str(index))
+            bodies.append(MultipartStream(fields, [("data0", file_tuple)]))
+        
+        # Aggregate per-image byte counts into one progress figure
+        total_bytes = sum(len(body) for body in bodies)
+        sent = [0] * len(bodies)
+        progress_lock = threading.Lock()
+        
+        def make_progress(index):
+            def on_progress(bytes_sent, _):
+                with progress_lock:
+                    sent[index] = bytes_sent
+                    if progress_callback:
+                        progress_callback(sum(sent), total_bytes)
+            return on_progress
+        
+        def analyze(index):
+            bodies[index].progress_callback = make_progress(index)
+            return unwrap_payload(self.post_json(
+                settings.PSYCHOMETRIC_IMAGE_ENDPOINT,
+                settings.READ_TIMEOUT,
+                on_retry=on_retry,
+                on_wait=on_wait,
+                data=bodies[index],
+                headers={'Content-Type': bodies[index].content_type}
+            ))
+        
+        with ThreadPoolExecutor(max_workers=max(1, len(bodies)), thread_name_prefix="n8n-image") as executor:
+            reports = list(executor.map(analyze, range(len(bodies))))
+        return merge_image_reports(reports)
+    
+    # ─── JOB MODE ──────────────────────────────
+    def submit_psychometric_job(self, form_data, files, on_retry=None, progress_callback=None, on_wait=None):
+        """
+        Submit a psychometric analysis job and return as soon as it is accepted
+        
+        Args:
+            form_data (dict): Form data with name, age, grade, fileCount
+            files (list): List of file tuples for upload
+            on_retry (callable): Called with (attempt, delay, error) before each retry
+            progress_callback (callable): Called with (bytes_sent, total_bytes)
+            on_wait (callable): Called with the estimated seconds left while queued for a slot
+        
+        Returns:
+            str: Job ID to poll with get_job_status / wait_for_job
+        """
+        
+        body = MultipartStream(form_data, files, progress_callback=progress_callback)
+        job = self.post_json(
+            settings.PSYCHOMETRIC_JOB_ENDPOINT,
+            settings.JSON_READ_TIMEOUT,
+            on_retry=on_retry,
+            on_wait=on_wait,
+            data=body,
+            headers={'Content-Type': body.content_type}
+        )
+        job = unwrap_payload(job)
+        if not job or not job.get("jobId"):
+            raise Exception("Job submission was not acknowledged with a job ID")
+        return job["jobId"]
+    
+    def get_job_status(self, job_id, wait=0):
+        """
+        Fetch a job's status, optionally long-polling until it changes
+        
+        Args:
+            job_id (str): ID returned by submit_psychometric_job
+            wait (int): Seconds the server may hold the request waiting for a change
+        
+        Returns:
+            dict: {"jobId", "status", "progress", "stage", "partial", "result", "error"}
+                  where status is queued, running, completed or failed
+        """
+        
+        return unwrap_payload(self.get_json(
+            f"{settings.JOB_STATUS_ENDPOINT}/{job_id}",
+            wait + settings.CONNECTION_TIMEOUT,
+            # Status polls share the job path with submissions but get their own cap
+            admission_key=f"{settings.JOB_STATUS_ENDPOINT}/*",
+            params={'wait': wait} if wait else None
+        ))
+    
+    def wait_for_job(self, job_id, on_status=None, timeout=None):
+        """
+        Long-poll a job until it completes
+        
+        Args:
+            job_id (str): ID returned by submit_psychometric_job
+            on_status (callable): Called with every status dict, for progress display
+            timeout (float): Seconds to wait overall, defaults to settings.JOB_MAX_WAIT
+        
+        Returns:
+            dict: The job's result payload
+        """
+        
+        deadline = time.monotonic() + (timeout or settings.JOB_MAX_WAIT)
+        last_progress = None
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise JobFailedError(f"Analysis job {job_id} did not finish in time")
+            
+            poll_started = time.monotonic()
+            status = self.get_job_status(job_id, wait=int(min(settings.JOB_LONG_POLL_SECONDS, max(1, remaining))))
+            if on_status:
+                on_status(status)
+            
+            if status.get("status") == "completed":
+                return status.get("result")
+            if status.get("status") == "failed":
+                raise JobFailedError(status.get("error") or f"Analysis job {job_id} failed")
+            
+            # Servers without long-poll support answer immediately; don't spin on them
+            unchanged = status.get("progress") == last_progress
+            if unchanged and time.monotonic() - poll_started < settings.JOB_POLL_INTERVAL:
+                time.sleep(settings.JOB_POLL_INTERVAL)
+            last_progress = status.get("progress")
+    
+    def request_career_analysis(self, career_request_data, force_refresh=False, on_wait=None, base_request=None):
         """
         Request career analysis from webhook
         
+        Results are memoized on a canonical hash of the request body, so a
+        reanalysis of an unchanged report does not go back to n8n, and an
+        identical request already in flight is joined rather than repeated.
+        
         Args:
             career_request_data (dict): Career analysis request data
+            force_refresh (bool): Skip the cache lookup and run a fresh analysis
+            on_wait (callable): Called with the estimated seconds left while queued for a slot
+            base_request (dict): Request built from the unedited report, sent as a delta base
         
         Returns:
-            dict: Parsed career analysis response
+            CareerAnalysis: Validated career analysis parsed from the webhook response
         """
         
-        try:
-            self.session.headers.update({
-                'Content-Type': 'application/json'
-            })
-            
-            response = self.session.post(
-                f"{self.base_url}/google-career-analysis",
-                json=career_request_data,
-                timeout=(30, 120)
+        cache_key = canonical_hash(career_request_data)
+        if not force_refresh:
+            cached = self.career_cache.get(cache_key)
+            if cached is not None:
+                return CareerAnalysis.from_dict(cached)
+        
+        def fetch():
+            career_data = self._fetch_career_analysis(career_request_data, on_wait=on_wait, base_request=base_request)
+            career_analysis = CareerAnalysis.from_dict(career_data)
+            self.career_cache.set(cache_key, career_data)
+            return career_analysis
+        
+        return self.inflight.do(("career", cache_key), fetch)
+    
+    def _fetch_career_analysis(self, career_request_data, on_wait=None, base_request=None):
+        """Call the career analysis webhook, hedged when settings.CAREER_HEDGING_ENABLED"""
+        
+        def send(on_admitted=None):
+            return self.post_json_document(
+                settings.CAREER_ANALYSIS_ENDPOINT,
+                settings.JSON_READ_TIMEOUT,
+                career_request_data,
+                base_document=base_request,
+                on_wait=on_wait,
+                on_admitted=on_admitted
             )
-            response.raise_for_status()
-            
-            # Parse career response
-            career_data = response.json()
-            if isinstance(career_data, list) and career_data:
-                career_data = career_data[0]
+        
+        try:
+            if settings.CAREER_HEDGING_ENABLED:
+                # No hedge while every career slot is taken: it would only add load
+                career_data = self.career_hedger.call(
+                    send,
+                    can_hedge=lambda: self.admission.governor.has_free_slot(settings.CAREER_ANALYSIS_ENDPOINT)
+                )
+            else:
+                career_data = send()
+            career_data = unwrap_payload(career_data)
             
             # Extract the actual career analysis from n8n structure
-            if career_data.get("reportData") and career_data["reportData"].get("careerAnalysis"):
-                return career_data["reportData"]["careerAnalysis"]
-            else:
-                # Fallback to direct structure
-                return career_data
+            return extract_career_analysis(career_data)
                 
+        except (CircuitOpenError, AdmissionTimeoutError):
+            raise
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to generate career recommendations: {e}")
         except Exception as e:
             raise Exception(f"An error occurred during career analysis: {e}")
 
-    def request_google_export(self, payload):
+    def request_google_export(self, payload, on_wait=None, base_payload=None):
         """
         Request Google Docs export from N8N workflow
         
         Args:
             payload (dict): Combined psychometric and career data
                            {"psychometricData": {...}, "careerData": {...}}
+            on_wait (callable): Called with the estimated seconds left while queued for a slot
+            base_payload (dict): Payload built from the unedited data, sent as a delta base
+        
+        Repeat exports of unchanged content return the recorded document
+        instead of creating a duplicate, and a second export started while
+        the first is still running waits for and shares its result.
         
         Returns:
-            dict: Export response with success status and document URL
+            dict: Export response with success status and document URL;
+                  "reused" is True when an earlier export of the same content is returned
         """
         
+        idempotency_key = export_idempotency_key(payload)
+        existing = self.export_records.get(idempotency_key)
+        if existing is not None:
+            return dict(existing, reused=True)
+        
+        return self.inflight.do(
+            ("export", idempotency_key),
+            lambda: self._send_google_export(payload, idempotency_key, on_wait, base_payload)
+        )
+    
+    def _send_google_export(self, payload, idempotency_key, on_wait=None, base_payload=None):
+        """Call the Google export webhook and record the created document"""
+        
         try:
-            self.session.headers.update({
-                'Content-Type': 'application/json'
-            })
-            
-            response = self.session.post(
-                f"{self.base_url}/google-export",  # Updated endpoint name
-                json=payload,
-                timeout=(30, 120)
+            result = self.post_json_document(
+                settings.GOOGLE_EXPORT_ENDPOINT,
+                settings.JSON_READ_TIMEOUT,
+                payload,
+                headers={'Idempotency-Key': idempotency_key},
+                base_document=base_payload,
+                on_wait=on_wait,
+                # n8n ignores Idempotency-Key, so a resent export would create a second doc
+                retry_unsafe=False
             )
-            response.raise_for_status()
-            
-            # Parse export response
-            result = response.json()
-            if isinstance(result, list) and result:
-                result = result[0]
             
+            result = unwrap_payload(result)
+            if result.get("documentUrl"):
+                self.export_records.set(idempotency_key, {"success": True, "documentUrl": result["documentUrl"]})
             return result
                 
+        except (CircuitOpenError, AdmissionTimeoutError):
+            raise
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to export to Google Docs: {e}")
         except Exception as e:
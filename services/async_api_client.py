@@ -0,0 +1,58 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from services.api_client import n8n_client
+
+class AsyncN8NClient:
+    """
+    Awaitable N8NClient for asyncio callers such as headless batch scripts
+
+    Each call runs the wrapped client's method on a bounded thread pool, so it
+    goes through the same keep-alive connection pool, RetryEngine and circuit
+    breaker, AdmissionController, result caches and request compression as the
+    Streamlit pages; there is no second HTTP stack with its own limits to keep
+    in step. Many coroutines can be gathered at once; at most max_workers
+    calls are on the wire, which by default matches the per-host pool size.
+    """
+
+    def __init__(self, client=None, max_workers=None):
+        self.client = client or n8n_client
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.POOL_MAX_PER_HOST,
+            thread_name_prefix="n8n-async"
+        )
+
+    async def _call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    async def upload_psychometric_data(self, *args, **kwargs):
+        """Awaitable N8NClient.upload_psychometric_data"""
+        return await self._call(self.client.upload_psychometric_data, *args, **kwargs)
+
+    async def submit_psychometric_job(self, *args, **kwargs):
+        """Awaitable N8NClient.submit_psychometric_job"""
+        return await self._call(self.client.submit_psychometric_job, *args, **kwargs)
+
+    async def wait_for_job(self, *args, **kwargs):
+        """Awaitable N8NClient.wait_for_job"""
+        return await self._call(self.client.wait_for_job, *args, **kwargs)
+
+    async def request_career_analysis(self, *args, **kwargs):
+        """Awaitable N8NClient.request_career_analysis"""
+        return await self._call(self.client.request_career_analysis, *args, **kwargs)
+
+    async def request_google_export(self, *args, **kwargs):
+        """Awaitable N8NClient.request_google_export"""
+        return await self._call(self.client.request_google_export, *args, **kwargs)
+
+    def close(self):
+        """Stop the worker threads once the calls in flight have finished"""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: DiskCache.update() is only atomic within one process
+    fcntl = None
+
+MISSING = object()
+
+def hash_upload(form_data, files, chunk_size=64 * 1024):
+    """
+    Content hash of a psychometric upload: image bytes plus name, age and grade
+
+    Args:
+        form_data (dict): Form data with name, age, grade
+        files (list): (field_name, (file_name, content, content_type)) tuples
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for field in ("name", "age", "grade"):
+        digest.update(f"{field}={str(form_data.get(field, '')).strip()}\n".encode())
+
+    for _, (_, content, _) in files:
+        if isinstance(content, (bytes, bytearray)):
+            digest.update(hashlib.sha256(content).digest())
+            continue
+        file_digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in iter(lambda: content.read(chunk_size), b""):
+            file_digest.update(chunk)
+        content.seek(0)
+        digest.update(file_digest.digest())
+    return digest.hexdigest()
+
+def normalize(value):
+    """Normalize a JSON document so cosmetic differences hash the same"""
+    if isinstance(value, dict):
+        return {str(key): normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if value is None or isinstance(value, bool):
+        return value
+    # Collapse whitespace and treat 14 and "14" alike
+    return re.sub(r"\s+", " ", str(value)).strip()
+
+def canonical_hash(document):
+    """
+    Hash of a JSON document that ignores key order and whitespace-only edits
+
+    Args:
+        document: Any JSON-serializable structure
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    canonical = json.dumps(normalize(document), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+# ─── MEMORY TIER ──────────────────────────────
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache of JSON-serializable values
+
+    Values are stored serialized, so callers always get a fresh copy they can
+    mutate (the edit widgets update report dicts in place).
+    """
+
+    def __init__(self, max_entries, ttl=None):
+        """
+        Args:
+            max_entries (int): Least recently used entries are dropped above this count
+            ttl (float): Seconds an entry stays valid, None for no expiry
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at or None, serialized value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, MISSING)
+            if entry is not MISSING and entry[0] is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = MISSING
+            if entry is MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(entry[1])
+
+    def set(self, key, value, expires_at=None):
+        """Store a value until expires_at (epoch seconds), default ttl from now"""
+        serialized = json.dumps(value)
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, serialized)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+# ─── DISK TIER ──────────────────────────────
+class DiskCache:
+    """JSON files on disk with a time-to-live and a total size cap"""
+
+    def __init__(self, directory, ttl=None, max_bytes=None):
+        """
+        Args:
+            directory (str): Folder holding one <key>.json file per entry
+            ttl (float): Seconds an entry stays valid, None for no expiry
+            max_bytes (int): Evict least recently used files above this size, None for no cap
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            modified = os.path.getmtime(path)
+            if self.ttl is not None and time.time() - modified > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            # Touch the entry so size-based eviction drops the coldest files first
+            os.utime(path, (time.time(), modified))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return default
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(temp_path, path)
+        if self.max_bytes is not None:
+            self.evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def expires_at(self, key):
+        """Epoch seconds when an entry expires, or None without a ttl or entry"""
+        if self.ttl is None:
+            return None
+        try:
+            return os.path.getmtime(self._path(key)) + self.ttl
+        except OSError:
+            return None
+
+    def update(self, key, func):
+        """
+        Read-modify-write one entry atomically, across threads and processes sharing the directory
+
+        Args:
+            key (str): Entry to update
+            func (callable): Receives the current value (None if missing) and
+                             returns the new one, or None to delete the entry
+
+        Returns:
+            The new value
+        """
+        with self._update_lock, open(os.path.join(self.directory, ".update.lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            value = func(self.get(key))
+            if value is None:
+                self.delete(key)
+            else:
+                self.set(key, value)
+            return value
+
+    def evict(self):
+        """Remove expired entries, then the least recently read ones until under max_bytes"""
+        with self._lock:
+            entries = []
+            now = time.time()
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self.ttl is not None and now - stat.st_mtime > self.ttl:
+                    self._remove(path)
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if self.max_bytes is None or total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# ─── TIERED CACHE ──────────────────────────────
+class TieredCache:
+    """In-memory LRU in front of a disk cache, with hit/miss counters per tier"""
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, MISSING)
+        if value is not MISSING:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key, MISSING)
+            if value is not MISSING:
+                # Promoted entries expire with their disk copy, not a fresh ttl from now
+                self.memory.set(key, value, expires_at=self.disk.expires_at(key))
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self):
+        """Return hit/miss counters for both tiers"""
+        return {
+            "memory_hits": self.memory.hits,
+            "memory_misses": self.memory.misses,
+            "disk_hits": self.disk.hits if self.disk is not None else 0,
+            "disk_misses": self.disk.misses if self.disk is not None else 0,
+            "memory_entries": len(self.memory)
+        }
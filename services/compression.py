@@ -0,0 +1,49 @@
+import gzip
+import zlib
+from config import settings
+from services.json_codec import dumps
+
+ACCEPT_ENCODING = "gzip, deflate"
+# Statuses a webhook may answer when it can't read a Content-Encoding body
+COMPRESSION_REJECTED_STATUSES = (400, 415, 422)
+
+def compress(body, encoding="gzip"):
+    """Compress a request body with gzip or deflate"""
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.REQUEST_COMPRESSION_LEVEL)
+    if encoding == "deflate":
+        return zlib.compress(body, settings.REQUEST_COMPRESSION_LEVEL)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+def decompress(body, encoding):
+    """Undo compress(); an empty or identity encoding returns the body unchanged"""
+    if not encoding or encoding == "identity":
+        return body
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        return zlib.decompress(body)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+def encode_json_request(document, compress_body=True):
+    """
+    Serialize a JSON request body, compressing it when it is worth it
+
+    Bodies under settings.REQUEST_COMPRESSION_MIN_BYTES are sent as they are,
+    since compression would save little and still cost CPU on both sides.
+
+    Args:
+        document: JSON-serializable request body
+        compress_body (bool): Allow compression, e.g. False once the server refused it
+
+    Returns:
+        tuple: (body bytes, headers dict with Content-Type and any Content-Encoding)
+    """
+    body = dumps(document)
+    headers = {'Content-Type': 'application/json'}
+    if compress_body and settings.REQUEST_COMPRESSION_ENABLED and len(body) >= settings.REQUEST_COMPRESSION_MIN_BYTES:
+        compressed = compress(body, settings.REQUEST_COMPRESSION_ENCODING)
+        if len(compressed) < len(body):
+            body = compressed
+            headers['Content-Encoding'] = settings.REQUEST_COMPRESSION_ENCODING
+    return body, headers
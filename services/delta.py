@@ -0,0 +1,127 @@
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from config import settings
+
+# Structural diffs between JSON documents, so a reanalysis or re-export of an
+# edited report can send a base version ID plus the changed fields instead of
+# the whole document. Paths are lists of dict keys and list indexes.
+#
+# Delta body: {"baseVersion": <id>, "version": <id of the result>, "changes": [op, ...]}
+# op: {"op": "replace" | "add" | "remove", "path": [...], "value": ...}
+
+class DeltaApplyError(Exception):
+    """Raised when a delta does not fit its base document"""
+
+def version_id(document):
+    """Exact content ID of a JSON document, independent of key order"""
+    canonical = json.dumps(document, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def is_delta(body):
+    return isinstance(body, dict) and "baseVersion" in body and "changes" in body
+
+# ─── DIFF / APPLY ──────────────────────────────
+def diff(base, edited, path=()):
+    """
+    List the operations that turn base into edited
+
+    Args:
+        base: Original JSON document
+        edited: Edited JSON document
+
+    Returns:
+        list: Operations in the order apply() must run them
+    """
+    if isinstance(base, dict) and isinstance(edited, dict):
+        changes = []
+        for key in base:
+            if key not in edited:
+                changes.append({"op": "remove", "path": [*path, key]})
+        for key, value in edited.items():
+            if key not in base:
+                changes.append({"op": "add", "path": [*path, key], "value": value})
+            else:
+                changes.extend(diff(base[key], value, (*path, key)))
+        return changes
+
+    if isinstance(base, list) and isinstance(edited, list):
+        changes = []
+        for index in range(min(len(base), len(edited))):
+            changes.extend(diff(base[index], edited[index], (*path, index)))
+        for index in range(len(base), len(edited)):
+            changes.append({"op": "add", "path": [*path, index], "value": edited[index]})
+        # Remove from the end so earlier indexes stay valid
+        for index in range(len(base) - 1, len(edited) - 1, -1):
+            changes.append({"op": "remove", "path": [*path, index]})
+        return changes
+
+    if base == edited and type(base) is type(edited):
+        return []
+    return [{"op": "replace", "path": list(path), "value": edited}]
+
+def apply(base, changes):
+    """
+    Rebuild the edited document from its base and a diff() result
+
+    Returns:
+        A new document; base is not modified
+
+    Raises:
+        DeltaApplyError: If a path does not exist in the base
+    """
+    document = copy.deepcopy(base)
+    for change in changes:
+        path = change["path"]
+        if not path:
+            document = copy.deepcopy(change["value"])
+            continue
+        try:
+            parent = document
+            for step in path[:-1]:
+                parent = parent[step]
+            last = path[-1]
+            if change["op"] == "remove":
+                del parent[last]
+            elif change["op"] == "add" and isinstance(parent, list):
+                parent.insert(last, copy.deepcopy(change["value"]))
+            else:
+                if change["op"] == "replace" and isinstance(parent, dict) and last not in parent:
+                    raise KeyError(last)
+                parent[last] = copy.deepcopy(change["value"])
+        except (KeyError, IndexError, TypeError) as e:
+            raise DeltaApplyError(f"Cannot {change['op']} at {path}: {e}") from None
+    return document
+
+def make_delta(base, edited):
+    """Build the delta body that turns base into edited"""
+    return {"baseVersion": version_id(base), "version": version_id(edited), "changes": diff(base, edited)}
+
+# ─── KNOWN VERSIONS ──────────────────────────────
+class VersionRegistry:
+    """Bounded record of document versions the webhook server is known to hold"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or settings.DELTA_KNOWN_VERSIONS
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, version):
+        with self._lock:
+            if version in self._versions:
+                self._versions.move_to_end(version)
+                return True
+            return False
+
+    def add(self, version):
+        with self._lock:
+            self._versions[version] = True
+            self._versions.move_to_end(version)
+            while len(self._versions) > self.max_entries:
+                self._versions.popitem(last=False)
+
+    def discard(self, version):
+        with self._lock:
+            self._versions.pop(version, None)
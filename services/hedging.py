@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import settings
+
+# ─── LATENCY TRACKING ──────────────────────────────
+class LatencyTracker:
+    """Sliding window of recent call durations"""
+
+    def __init__(self, window=None):
+        self._samples = deque(maxlen=window or settings.HEDGE_LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent, min_samples=1):
+        """Return the given latency percentile, or None with fewer than min_samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+# ─── HEDGED CALLS ──────────────────────────────
+class Hedger:
+    """
+    Send a backup copy of a slow request and take whichever answers first
+
+    The backup fires once the primary has run longer than the configured
+    percentile of recent latencies. Requests cannot be aborted mid-flight, so
+    cancelling the loser is best effort: it is dropped if it has not started,
+    otherwise it finishes in the background and its result is discarded.
+    """
+
+    def __init__(self, percentile=None, min_samples=None, default_delay=None, max_workers=None):
+        self.percentile = percentile or settings.HEDGE_PERCENTILE
+        self.min_samples = min_samples or settings.HEDGE_MIN_SAMPLES
+        self.default_delay = default_delay or settings.HEDGE_DEFAULT_DELAY
+        self.latencies = LatencyTracker()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.HEDGE_WORKERS,
+            thread_name_prefix="n8n-hedge"
+        )
+        self._lock = threading.Lock()
+        self.hedges_fired = 0
+        self.hedges_won = 0  # Hedges that answered before the primary
+
+    def hedge_delay(self):
+        """Seconds to wait for the primary before sending the hedge"""
+        observed = self.latencies.percentile(self.percentile, self.min_samples)
+        return self.default_delay if observed is None else observed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hedges_fired": self.hedges_fired,
+                "hedges_won": self.hedges_won,
+                "hedge_delay": self.hedge_delay()
+            }
+
+    def _timed(self, func, admitted):
+        """Run func(on_admitted), timing it from admission rather than from submit()"""
+        started = []
+
+        def on_admitted():
+            if not started:
+                started.append(time.monotonic())
+                admitted.set()
+
+        try:
+            result = func(on_admitted)
+        finally:
+            # Also release call() when func fails before it is admitted
+            admitted.set()
+        if started:
+            self.latencies.record(time.monotonic() - started[0])
+        return result
+
+    def call(self, func, can_hedge=None):
+        """
+        Call func(), hedging with a second func() if the first is slow
+
+        The hedge delay counts from when the primary is admitted, so time spent
+        in the executor or admission queue never makes a request look slow.
+
+        Args:
+            func (callable): Performs one complete request; must be safe to run twice.
+                             Receives on_admitted, to call when the request leaves the
+                             admission queue
+            can_hedge (callable): Returns False when the hedge should be skipped,
+                                  e.g. because the endpoint has no free slot
+
+        Returns:
+            The first successful result; if both fail, the primary's error is raised
+        """
+        admitted = threading.Event()
+        primary = self._executor.submit(self._timed, func, admitted)
+        admitted.wait()
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        if done:
+            return primary.result()
+        if can_hedge is not None and not can_hedge():
+            return primary.result()
+
+        hedge = self._executor.submit(self._timed, func, threading.Event())
+        with self._lock:
+            self.hedges_fired += 1
+
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is hedge:
+                        with self._lock:
+                            self.hedges_won += 1
+                    return future.result()
+        return primary.result()
@@ -0,0 +1,151 @@
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image, ImageChops, ImageOps
+from config import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Return the process pool shared by every session in this process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Forking a multi-threaded Streamlit server can copy held locks into the child
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PREPROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return _executor
+
+def crop_whitespace(image, threshold, margin):
+    """Crop near-white borders around a screenshot, keeping a small margin"""
+    grayscale = image.convert("L")
+    # Pixels more than threshold grey levels away from white count as content
+    content_mask = ImageChops.invert(grayscale).point(lambda value: 255 if value > threshold else 0)
+    bbox = content_mask.getbbox()
+    if not bbox:
+        return image
+
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(0, left - margin),
+        max(0, top - margin),
+        min(image.width, right + margin),
+        min(image.height, bottom + margin)
+    ))
+
+def preprocess_image(source_path, file_name, max_dimension, jpeg_quality, whitespace_threshold):
+    """
+    Downscale, crop and recompress one screenshot (runs in a worker process)
+
+    Args:
+        source_path (str): Temp file holding the original image
+        file_name (str): Original file name
+        max_dimension (int): Longest side of the output image in pixels
+        jpeg_quality (int): JPEG quality for the recompressed image
+        whitespace_threshold (int): Grey levels below white at which a pixel counts as content
+
+    Returns:
+        tuple: (file_name, content_type, image_bytes), or None when processing
+               would not make the image smaller
+    """
+    with Image.open(source_path) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode != "RGB":
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.convert("RGBA").split()[-1])
+            image = background
+
+        image = crop_whitespace(image, whitespace_threshold, margin=8)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    # Flat-colour screenshots often stay smaller as PNG, photos of screens as JPEG
+    candidates = []
+    for image_format, extension, mime_type, options in (
+        ("JPEG", ".jpg", "image/jpeg", {"quality": jpeg_quality, "optimize": True}),
+        ("PNG", ".png", "image/png", {"optimize": True})
+    ):
+        output = io.BytesIO()
+        image.save(output, format=image_format, **options)
+        candidates.append((len(output.getvalue()), extension, mime_type, output.getvalue()))
+    size, extension, mime_type, processed = min(candidates, key=lambda candidate: candidate[0])
+
+    if size >= os.path.getsize(source_path):
+        return None
+    return f"{os.path.splitext(file_name)[0]}{extension}", mime_type, processed
+
+def spool_to_temp(f, directory):
+    """Copy an uploaded file to a temp file in chunks, returning (path, size)"""
+    f.seek(0)
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as out:
+        shutil.copyfileobj(f, out, 64 * 1024)
+    f.seek(0)
+    return out.name, os.path.getsize(out.name)
+
+def preprocess_uploads(uploaded_files, on_progress=None):
+    """
+    Preprocess uploaded screenshots in the shared process pool
+
+    Each screenshot goes to the pool as a temp file path rather than as bytes,
+    and only the downscaled result (bounded by IMAGE_MAX_DIMENSION) comes
+    back, so this process never holds a second copy of the originals. Images
+    that fail to process, or would not shrink, are forwarded unchanged so a
+    Pillow error never blocks a report.
+
+    Args:
+        uploaded_files (list): Streamlit UploadedFile objects (or any file with name/type/seek/read)
+        on_progress (callable): Called with (images_done, images_total)
+
+    Returns:
+        tuple: (files, stats) where files is a list of (file_name, file object, content_type)
+               in upload order and stats has original_bytes, processed_bytes,
+               bytes_saved and seconds
+    """
+    started = time.perf_counter()
+    files = [(f.name, f, f.type) for f in uploaded_files]
+    sizes = [0] * len(files)
+
+    with tempfile.TemporaryDirectory(prefix="preprocess-") as directory:
+        futures = {}
+        for index, f in enumerate(uploaded_files):
+            source_path, sizes[index] = spool_to_temp(f, directory)
+            future = get_executor().submit(
+                preprocess_image,
+                source_path,
+                f.name,
+                settings.IMAGE_MAX_DIMENSION,
+                settings.IMAGE_JPEG_QUALITY,
+                settings.IMAGE_WHITESPACE_THRESHOLD
+            )
+            futures[future] = index
+
+        processed_bytes = list(sizes)
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                # Keep the original for images Pillow cannot handle
+                result = None
+            if result is not None:
+                file_name, content_type, data = result
+                files[index] = (file_name, io.BytesIO(data), content_type)
+                processed_bytes[index] = len(data)
+            if on_progress:
+                on_progress(done, len(futures))
+
+    original_bytes = sum(sizes)
+    stats = {
+        "original_bytes": original_bytes,
+        "processed_bytes": sum(processed_bytes),
+        "bytes_saved": original_bytes - sum(processed_bytes),
+        "seconds": time.perf_counter() - started
+    }
+    return files, stats
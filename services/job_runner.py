@@ -0,0 +1,312 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from services.models import Report, CareerAnalysis
+from services.session_store import STORE_ERRORS, session_store
+
+# Job results that are models travel through the shared store as their dicts
+RESULT_MODELS = {model.__name__: model for model in (Report, CareerAnalysis)}
+
+class RemoteJobError(Exception):
+    """A job that ran in another worker process failed, or that worker went away"""
+
+def encode_result(result):
+    if type(result).__name__ in RESULT_MODELS:
+        return {"model": type(result).__name__, "data": result.to_dict()}
+    return {"model": None, "data": result}
+
+def decode_result(encoded):
+    if encoded is None:
+        return None
+    model = RESULT_MODELS.get(encoded["model"])
+    return model.from_dict(encoded["data"]) if model else encoded["data"]
+
+class Job:
+    """State of one background webhook job, readable from any rerun"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self, session_id, kind):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.kind = kind
+        self.status = self.QUEUED
+        self.progress = 0
+        self.message = "Waiting to start..."
+        self.result = None
+        self.error = None
+        self.details = {}  # Extra job-specific facts for the UI, e.g. image_stats
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.on_change = None  # Set by the runner to publish updates to other workers
+        self.publish_lock = threading.Lock()  # Keeps a heartbeat from landing after the final state
+        self.cancelled = False  # Set by JobRunner.clear(); the job keeps running but is never published again
+
+    @property
+    def done(self):
+        return self.status in (self.COMPLETED, self.FAILED)
+
+    def update(self, progress=None, message=None):
+        """Report progress from inside the job function"""
+        if progress is not None:
+            self.progress = max(0, min(100, int(progress)))
+        if message is not None:
+            self.message = message
+        if self.on_change:
+            self.on_change(self)
+
+    def report_queue_wait(self, seconds):
+        """Record the estimated wait for a webhook slot, 0 once the call is admitted"""
+        self.details['queue_wait'] = seconds
+        if self.on_change:
+            self.on_change(self)
+
+    def to_dict(self):
+        """JSON-serializable snapshot for the shared job state"""
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": encode_result(self.result) if self.status == self.COMPLETED else None,
+            "error": str(self.error) if self.error is not None else None,
+            "details": self.details,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "published_at": time.time()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Read-only copy of a job published by another worker"""
+        job = cls(data["session_id"], data["kind"])
+        job.id = data["id"]
+        job.status = data["status"]
+        job.progress = data["progress"]
+        job.message = data["message"]
+        job.result = decode_result(data["result"])
+        job.error = RemoteJobError(data["error"]) if data["error"] is not None else None
+        job.details = data["details"]
+        job.submitted_at = data["submitted_at"]
+        job.finished_at = data["finished_at"]
+        return job
+
+class JobRunner:
+    """
+    Thread pools that own analysis and export calls so Streamlit reruns never
+    block on a webhook. Jobs are addressed by (session_id, kind), which survives
+    browser refreshes because the session ID lives in the URL.
+
+    Each kind has its own pool, so jobs of one kind queued for their
+    endpoint's admission slots never keep another kind from starting.
+
+    With a state store, jobs are also published there so any worker process
+    serving the session can show their progress and collect their result. The
+    owning worker republishes running jobs as a heartbeat; a running job whose
+    heartbeat stops is reported as failed instead of spinning forever.
+    """
+
+    def __init__(self, max_workers=None, state_store=None):
+        """
+        Args:
+            max_workers (int): Threads per job kind, default settings.JOB_RUNNER_WORKERS_BY_KIND
+                               or settings.JOB_RUNNER_WORKERS for kinds not listed there
+            state_store: Session store to publish jobs to, None to keep them in this process
+        """
+        self.max_workers = max_workers
+        self._executors = {}  # kind -> ThreadPoolExecutor, created on first use
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.state_store = state_store
+        self._published = {}  # job id -> time of its last publish
+        self._heartbeat = None
+
+    def submit(self, session_id, kind, func):
+        """
+        Start func(job) in the background unless that session already has one running
+
+        Args:
+            session_id (str): Session the job belongs to
+            kind (str): Job type, e.g. "report", "career" or "export"
+            func (callable): Receives the Job; its return value becomes job.result
+
+        Returns:
+            Job: The new job, or the one already in flight for this session and kind
+                 (possibly a copy of one running in another worker)
+        """
+        self._prune()
+        with self._lock:
+            existing = self._jobs.get((session_id, kind))
+            if existing is not None and not existing.done:
+                return existing
+        remote = self._load(session_id, kind)
+        if remote is not None and not remote.done:
+            return remote
+
+        with self._lock:
+            existing = self._jobs.get((session_id, kind))
+            if existing is not None and not existing.done:
+                return existing
+            job = Job(session_id, kind)
+            self._jobs[(session_id, kind)] = job
+
+        if self.state_store is not None:
+            job.on_change = self._publish
+            self._publish(job, force=True)
+            self._start_heartbeat()
+        self._executor_for(kind).submit(self._run, job, func)
+        return job
+
+    def _executor_for(self, kind):
+        with self._lock:
+            executor = self._executors.get(kind)
+            if executor is None:
+                workers = self.max_workers or settings.JOB_RUNNER_WORKERS_BY_KIND.get(kind, settings.JOB_RUNNER_WORKERS)
+                executor = self._executors[kind] = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix=f"n8n-job-{kind}"
+                )
+            return executor
+
+    def _run(self, job, func):
+        job.status = Job.RUNNING
+        try:
+            job.result = func(job)
+            job.progress = 100
+            # finished_at goes first: _prune() reads it as soon as the job looks done
+            job.finished_at = time.time()
+            job.status = Job.COMPLETED
+        except Exception as e:
+            job.error = e
+            job.finished_at = time.time()
+            job.status = Job.FAILED
+        finally:
+            if self.state_store is not None:
+                self._publish(job, force=True)
+
+    def get(self, session_id, kind):
+        """Return the session's latest job of this kind, or None"""
+        with self._lock:
+            job = self._jobs.get((session_id, kind))
+        if job is None:
+            return self._load(session_id, kind)
+        if job.done and self.state_store is not None and self._collected_elsewhere(job):
+            with self._lock:
+                if self._jobs.get((session_id, kind)) is job:
+                    del self._jobs[(session_id, kind)]
+            return None
+        return job
+
+    def clear(self, session_id, kind=None):
+        """
+        Forget a session's jobs of a kind, or all of them when kind is None
+
+        Jobs still running are cancelled: they finish in the background, but
+        their result is never published, so it can't resurface for whoever
+        uses the session next (e.g. after New Assessment).
+        """
+        with self._lock:
+            cleared = []
+            for key in list(self._jobs):
+                if key[0] == session_id and (kind is None or key[1] == kind):
+                    cleared.append(self._jobs.pop(key))
+                    self._published.pop(cleared[-1].id, None)
+        for job in cleared:
+            with job.publish_lock:
+                job.cancelled = True
+        if self.state_store is not None:
+            try:
+                self.state_store.delete_jobs(session_id, kind)
+            except STORE_ERRORS:
+                pass
+
+    def _prune(self):
+        """Drop finished jobs nobody collected within JOB_RESULT_TTL"""
+        cutoff = time.time() - settings.JOB_RESULT_TTL
+        with self._lock:
+            for key, job in list(self._jobs.items()):
+                if job.done and job.finished_at is not None and job.finished_at < cutoff:
+                    self._published.pop(job.id, None)
+                    del self._jobs[key]
+
+    # ─── SHARED STATE ──────────────────────────────
+    def _publish(self, job, force=False, heartbeat=False):
+        """
+        Write a job's state to the store, at most every JOB_STATE_SYNC_INTERVAL unless forced
+
+        A heartbeat publish is skipped once the job is done, so it can never
+        overwrite the final state with a stale "running" one.
+        """
+        now = time.time()
+        with self._lock:
+            if job.cancelled or (not force and now - self._published.get(job.id, 0) < settings.JOB_STATE_SYNC_INTERVAL):
+                return
+            first = job.id not in self._published
+            self._published[job.id] = now
+        with job.publish_lock:
+            if job.cancelled or (heartbeat and job.done):
+                return
+            try:
+                if not first and self._collected_elsewhere(job):
+                    # Another worker cleared the session; don't bring the job back
+                    job.cancelled = True
+                    return
+                self.state_store.save_job(job.session_id, job.kind, job.to_dict())
+            except STORE_ERRORS:
+                # Other workers lose sight of the job; this one still has it
+                pass
+
+    def _load(self, session_id, kind):
+        """Copy of a job published by any worker, or None"""
+        if self.state_store is None:
+            return None
+        try:
+            data = self.state_store.load_job(session_id, kind)
+        except STORE_ERRORS:
+            return None
+        if data is None:
+            return None
+
+        job = Job.from_dict(data)
+        now = time.time()
+        if job.done and job.finished_at < now - settings.JOB_RESULT_TTL:
+            return None
+        if not job.done and now - data["published_at"] > settings.JOB_STALE_AFTER:
+            job.status = Job.FAILED
+            job.error = RemoteJobError("The worker running this job stopped responding. Please try again.")
+            job.finished_at = now
+        return job
+
+    def _collected_elsewhere(self, job):
+        """True if another worker already cleared this job from the store"""
+        try:
+            data = self.state_store.load_job(job.session_id, job.kind)
+        except STORE_ERRORS:
+            return False
+        return data is None or data["id"] != job.id
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _heartbeat_loop(self):
+        """Republish running jobs so other workers can tell they are still alive"""
+        while True:
+            time.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+            with self._lock:
+                running = [job for job in self._jobs.values() if not job.done]
+            for job in running:
+                self._publish(job, force=True, heartbeat=True)
+
+# Create singleton instance
+job_runner = JobRunner(state_store=session_store if settings.SESSION_STORE_ENABLED and settings.SHARED_JOB_STATE else None)
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from config import settings
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the stdlib decoder is used without it
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+CHUNK_SIZE = 64 * 1024
+
+class ResponseTooLargeError(Exception):
+    """Raised when a webhook response exceeds settings.MAX_RESPONSE_BYTES"""
+
+class ResponseDecodeError(ValueError):
+    """Raised when a webhook response body is not valid JSON"""
+
+def loads(data):
+    """Decode JSON bytes or text with the fastest available backend"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(document):
+    """Encode a document as compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(document)
+    return json.dumps(document, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+# ─── METRICS ──────────────────────────────
+class DecodeMetrics:
+    """Per-endpoint JSON decode counts, sizes and timings"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, label, size, seconds):
+        with self._lock:
+            stats = self._stats.setdefault(label, {"count": 0, "bytes": 0, "seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["bytes"] += size
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def snapshot(self):
+        """Return a copy of the stats, keyed by endpoint, with the backend in use"""
+        with self._lock:
+            return {"backend": BACKEND, "endpoints": {label: dict(stats) for label, stats in self._stats.items()}}
+
+decode_metrics = DecodeMetrics()
+
+# ─── DECODING ──────────────────────────────
+def decode_body(body, label):
+    """
+    Decode a complete response body, recording how long it took
+
+    Args:
+        body (bytes): Raw response body
+        label (str): Endpoint the body came from, for metrics
+
+    Returns:
+        The decoded JSON document
+
+    Raises:
+        ResponseDecodeError: With the start of the body, decoded only for the message
+    """
+    started = time.perf_counter()
+    try:
+        document = loads(body)
+    except ValueError:
+        raise ResponseDecodeError(f"Invalid JSON response: {body[:500].decode('utf-8', 'replace')}...") from None
+    decode_metrics.record(label, len(body), time.perf_counter() - started)
+    return document
+
+def check_length(content_length, max_bytes):
+    """Reject a response up front when its declared size is over the limit"""
+    if content_length is not None and int(content_length) > max_bytes:
+        raise ResponseTooLargeError(f"Response of {int(content_length)} bytes exceeds the {max_bytes} byte limit")
+
+def read_body(response, max_bytes=None):
+    """
+    Read a streamed requests response, stopping as soon as it exceeds max_bytes
+
+    The limit applies to the decompressed body, and the response is always
+    closed so its connection goes back to the pool.
+    """
+    max_bytes = max_bytes or settings.MAX_RESPONSE_BYTES
+    try:
+        check_length(response.headers.get('Content-Length'), max_bytes)
+        body = bytearray()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            body += chunk
+            if len(body) > max_bytes:
+                raise ResponseTooLargeError(f"Response exceeds the {max_bytes} byte limit")
+        return bytes(body)
+    finally:
+        response.close()
+
+def read_json(response, label, max_bytes=None):
+    """Read and decode a streamed webhook response within the size limit"""
+    return decode_body(read_body(response, max_bytes), label)
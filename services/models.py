@@ -0,0 +1,307 @@
+import copy
+
+# Report and career analysis models, parsed once when a webhook answers.
+# Renderers read attributes directly instead of re-probing nested dicts on
+# every rerun, and edit through the session's versioned store; to_dict()
+# rebuilds the webhook-shaped payload for export, caching and the career
+# analysis request. Values keep the types n8n sent them with (a score may be
+# a number, a space a bare string); renderers go through display_text().
+
+INSIGHT_PREFIX = "INSIGHT: "
+
+class ReportValidationError(Exception):
+    """Raised when a webhook payload does not have the expected report structure"""
+
+def display_text(value):
+    """Text to render for a scalar payload value; None renders as empty"""
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+def _require(value, kind, where):
+    if not isinstance(value, kind):
+        raise ReportValidationError(f"Expected {kind.__name__} for {where}, got {type(value).__name__}")
+    return value
+
+def _present(data):
+    """Drop the keys n8n left out, which the models hold as None"""
+    return {key: value for key, value in data.items() if value is not None}
+
+def _extras(data, known):
+    """Keys the model does not know about, kept so to_dict round-trips them"""
+    extras = {key: value for key, value in data.items() if key not in known}
+    return copy.deepcopy(extras) if extras else None
+
+# ─── PSYCHOMETRIC REPORT ──────────────────────────────
+class TestRow:
+    """One row of a test table; HIGH5 rows carry a domain instead of a score, fields n8n left out stay None"""
+
+    __slots__ = ("preference", "score", "domain", "meaning", "extras")
+    FIELDS = ("preference", "score", "domain", "meaning")
+
+    def __init__(self, preference=None, score=None, domain=None, meaning=None, extras=None):
+        self.preference = preference
+        self.score = score
+        self.domain = domain
+        self.meaning = meaning
+        self.extras = extras
+
+    @classmethod
+    def from_dict(cls, data, where="test row"):
+        _require(data, dict, where)
+        return cls(**{field: data.get(field) for field in cls.FIELDS}, extras=_extras(data, cls.FIELDS))
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in self.FIELDS if getattr(self, field) is not None}
+        if self.extras:
+            data.update(copy.deepcopy(self.extras))
+        return data
+
+class Insight:
+    """One insight line; text is the line without its "INSIGHT: " label"""
+
+    __slots__ = ("line",)
+
+    def __init__(self, line):
+        self.line = line
+
+    @property
+    def text(self):
+        return display_text(self.line).replace(INSIGHT_PREFIX, "")
+
+    @text.setter
+    def text(self, value):
+        self.line = f"{INSIGHT_PREFIX}{value}"
+
+class Report:
+    """
+    Psychometric report: student info, test tables by testData key and insight lines
+
+    Insight lines line up with settings.TEST_DATA_KEYS, except in reports
+    merged from per-image uploads, which leave out tests without an insight
+    and name the test of each line in insight_keys (insightKeys).
+    """
+
+    __slots__ = ("student_info", "test_data", "insights", "insight_keys", "extras")
+    FIELDS = ("studentInfo", "testData", "insightLines", "insightKeys")
+
+    def __init__(self, student_info=None, test_data=None, insights=None, insight_keys=None, extras=None):
+        self.student_info = student_info or {}
+        self.test_data = test_data or {}
+        self.insights = insights or []
+        self.insight_keys = insight_keys
+        self.extras = extras
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Validate a report webhook payload and build the model
+
+        Args:
+            data (dict): Unwrapped payload with studentInfo, testData and insightLines
+
+        Returns:
+            Report: Parsed report
+
+        Raises:
+            ReportValidationError: If the payload is not shaped like a report
+        """
+        _require(data, dict, "report")
+        test_data = {}
+        for key, rows in _require(data.get("testData") or {}, dict, "testData").items():
+            rows = _require(rows or [], list, f"testData.{key}")
+            test_data[key] = [TestRow.from_dict(row, f"testData.{key}[{i}]") for i, row in enumerate(rows)]
+        insight_lines = _require(data.get("insightLines") or [], list, "insightLines")
+        insight_keys = data.get("insightKeys")
+        if insight_keys is not None:
+            insight_keys = list(_require(insight_keys, list, "insightKeys"))
+            if len(insight_keys) != len(insight_lines):
+                raise ReportValidationError("insightKeys must name the test of every insightLines entry")
+        return cls(
+            student_info=dict(_require(data.get("studentInfo") or {}, dict, "studentInfo")),
+            test_data=test_data,
+            insights=[Insight(line) for line in insight_lines],
+            insight_keys=insight_keys,
+            extras=_extras(data, cls.FIELDS)
+        )
+
+    def to_dict(self):
+        data = {
+            "studentInfo": dict(self.student_info),
+            "testData": {key: [row.to_dict() for row in rows] for key, rows in self.test_data.items()},
+            "insightLines": [insight.line for insight in self.insights]
+        }
+        if self.insight_keys is not None:
+            data["insightKeys"] = list(self.insight_keys)
+        if self.extras:
+            data.update(copy.deepcopy(self.extras))
+        return data
+
+    def insight_index(self, test_key, position):
+        """
+        Index in insights of the line shown under a test section, or None
+
+        Args:
+            test_key (str): The section's testData key
+            position (int): The section's index in settings.TEST_DATA_KEYS
+        """
+        if self.insight_keys is not None:
+            return self.insight_keys.index(test_key) if test_key in self.insight_keys else None
+        return position if position < len(self.insights) else None
+
+# ─── CAREER ANALYSIS ──────────────────────────────
+class CareerSummary:
+    """Core identity summary; fields n8n left out stay None"""
+
+    __slots__ = ("core_driver", "personality", "work_style", "learning_style")
+    KEYS = (("core_driver", "coreDriver"), ("personality", "personality"),
+            ("work_style", "workStyle"), ("learning_style", "learningStyle"))
+
+    def __init__(self, core_driver=None, personality=None, work_style=None, learning_style=None):
+        self.core_driver = core_driver
+        self.personality = personality
+        self.work_style = work_style
+        self.learning_style = learning_style
+
+    @classmethod
+    def from_dict(cls, data):
+        _require(data, dict, "summary")
+        return cls(**{attribute: data.get(key) for attribute, key in cls.KEYS})
+
+    def to_dict(self):
+        return {key: getattr(self, attribute) for attribute, key in self.KEYS if getattr(self, attribute) is not None}
+
+class CareerSpace:
+    """A career space to explore within a field; bare is set when n8n sent just the title string"""
+
+    __slots__ = ("title", "description", "bare")
+
+    def __init__(self, title=None, description=None, bare=False):
+        self.title = title
+        self.description = description
+        self.bare = bare
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, str):
+            return cls(title=data, bare=True)
+        _require(data, dict, "career space")
+        return cls(data.get("title"), data.get("description"))
+
+    def to_dict(self):
+        if self.bare and self.description is None:
+            return self.title
+        return _present({"title": self.title, "description": self.description})
+
+class LessAlignedArea:
+    """An area that fits the student less well, with the reason; bare as in CareerSpace"""
+
+    __slots__ = ("area", "reason", "bare")
+
+    def __init__(self, area=None, reason=None, bare=False):
+        self.area = area
+        self.reason = reason
+        self.bare = bare
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, str):
+            return cls(area=data, bare=True)
+        _require(data, dict, "less aligned area")
+        return cls(data.get("area"), data.get("reason"))
+
+    def to_dict(self):
+        if self.bare and self.reason is None:
+            return self.area
+        return _present({"area": self.area, "reason": self.reason})
+
+class CareerField:
+    """One recommended career field; key is its careerFields key, e.g. "field1" """
+
+    __slots__ = ("key", "title", "alignment", "description", "spaces", "less_aligned")
+
+    def __init__(self, key, title=None, alignment=None, description=None, spaces=None, less_aligned=None):
+        self.key = key
+        self.title = title
+        self.alignment = alignment
+        self.description = description
+        self.spaces = spaces or []
+        self.less_aligned = less_aligned or []
+
+    @classmethod
+    def from_dict(cls, key, data):
+        _require(data, dict, f"careerFields.{key}")
+        return cls(
+            key=key,
+            title=data.get("title"),
+            alignment=data.get("alignment"),
+            description=data.get("description"),
+            spaces=[CareerSpace.from_dict(space) for space in _require(data.get("spaces") or [], list, f"careerFields.{key}.spaces")],
+            less_aligned=[LessAlignedArea.from_dict(item) for item in _require(data.get("lessAligned") or [], list, f"careerFields.{key}.lessAligned")]
+        )
+
+    def to_dict(self):
+        data = _present({"title": self.title, "alignment": self.alignment, "description": self.description})
+        data["spaces"] = [space.to_dict() for space in self.spaces]
+        data["lessAligned"] = [item.to_dict() for item in self.less_aligned]
+        return data
+
+class CareerAnalysis:
+    """Career analysis: status message, summary and career fields in webhook order"""
+
+    __slots__ = ("user_message", "summary", "fields", "fields_as_list", "extras")
+    FIELDS = ("userMessage", "summary", "careerFields")
+
+    def __init__(self, user_message=None, summary=None, fields=None, fields_as_list=False, extras=None):
+        self.user_message = user_message
+        self.summary = summary
+        self.fields = fields or []
+        self.fields_as_list = fields_as_list  # careerFields came as a list and goes back as one
+        self.extras = extras
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Validate an extracted careerAnalysis payload and build the model
+
+        Args:
+            data (dict): The careerAnalysis object from the webhook response
+
+        Returns:
+            CareerAnalysis: Parsed career analysis
+
+        Raises:
+            ReportValidationError: If the payload is not shaped like a career analysis
+        """
+        _require(data, dict, "career analysis")
+        career_fields = data.get("careerFields") or {}
+        fields_as_list = isinstance(career_fields, list)
+        if fields_as_list:
+            # Some workflow versions send the fields as a list
+            career_fields = {f"field{i + 1}": field for i, field in enumerate(career_fields)}
+        _require(career_fields, dict, "careerFields")
+
+        user_message = data.get("userMessage")
+        if user_message:
+            user_message = dict(_require(user_message, dict, "userMessage"))
+        return cls(
+            user_message=user_message or None,
+            summary=CareerSummary.from_dict(data["summary"]) if data.get("summary") else None,
+            fields=[CareerField.from_dict(key, field) for key, field in career_fields.items()],
+            fields_as_list=fields_as_list,
+            extras=_extras(data, cls.FIELDS)
+        )
+
+    def to_dict(self):
+        data = {}
+        if self.user_message:
+            data["userMessage"] = dict(self.user_message)
+        if self.summary is not None:
+            data["summary"] = self.summary.to_dict()
+        if self.fields_as_list:
+            data["careerFields"] = [field.to_dict() for field in self.fields]
+        else:
+            data["careerFields"] = {field.key: field.to_dict() for field in self.fields}
+        if self.extras:
+            data.update(copy.deepcopy(self.extras))
+        return data
@@ -0,0 +1,95 @@
+import io
+import os
+import uuid
+
+CHUNK_SIZE = 64 * 1024
+
+def _stream_size(fileobj):
+    """Return the number of bytes left to read from a seekable file object"""
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell() - position
+    fileobj.seek(position)
+    return size
+
+class MultipartStream:
+    """
+    multipart/form-data request body that is read in chunks straight from the
+    uploaded file objects instead of being assembled in memory.
+
+    requests sends it with a Content-Length header because the total size is
+    known up front, and progress_callback(bytes_sent, total_bytes) is called as
+    each chunk goes out on the wire.
+    """
+
+    def __init__(self, fields, files, progress_callback=None, chunk_size=CHUNK_SIZE):
+        """
+        Args:
+            fields (dict): Text form fields
+            files (list): (field_name, (file_name, content, content_type)) tuples where
+                          content is a seekable file object or bytes
+            progress_callback (callable): Called with (bytes_sent, total_bytes)
+            chunk_size (int): Bytes read from a file per chunk
+        """
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.progress_callback = progress_callback
+        self.chunk_size = chunk_size
+
+        self._segments = []
+        for name, value in fields.items():
+            self._segments.append(io.BytesIO(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'.encode()
+            ))
+        for field_name, (file_name, content, content_type) in files:
+            if isinstance(content, (bytes, bytearray)):
+                content = io.BytesIO(content)
+            self._segments.append(io.BytesIO(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{field_name}"; filename="{file_name}"\r\n'
+                f'Content-Type: {content_type or "application/octet-stream"}\r\n\r\n'.encode()
+            ))
+            self._segments.append(content)
+            self._segments.append(io.BytesIO(b'\r\n'))
+        self._segments.append(io.BytesIO(f'--{self.boundary}--\r\n'.encode()))
+
+        self.rewind()
+        self.len = sum(_stream_size(segment) for segment in self._segments)
+
+    def __len__(self):
+        return self.len
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def rewind(self):
+        """Reset every segment so the body can be sent again on retry"""
+        for segment in self._segments:
+            segment.seek(0)
+        self._index = 0
+        self.bytes_sent = 0
+
+    def read(self, size=-1):
+        """Read up to size bytes across segment boundaries"""
+        if size is None or size < 0:
+            size = self.chunk_size
+
+        buffer = bytearray()
+        while len(buffer) < size and self._index < len(self._segments):
+            data = self._segments[self._index].read(size - len(buffer))
+            if data:
+                buffer.extend(data)
+            else:
+                self._index += 1
+
+        if buffer:
+            self.bytes_sent += len(buffer)
+            if self.progress_callback:
+                self.progress_callback(self.bytes_sent, self.len)
+        return bytes(buffer)
@@ -0,0 +1,59 @@
+from config import settings
+
+def build_career_request(student_info, report_data):
+    """
+    Build the career analysis webhook body from a psychometric report
+
+    Args:
+        student_info (dict): Student name, age and grade
+        report_data (Report): Parsed psychometric report
+
+    Returns:
+        dict: Request body for the career analysis webhook
+    """
+    return {
+        "studentInfo": {
+            "name": student_info.get('name', 'Student'),
+            "age": student_info.get('age', 'Unknown'),
+            "grade": student_info.get('grade', 'Unknown')
+        },
+        "editedTestData": {key: [row.to_dict() for row in rows] for key, rows in report_data.test_data.items()},
+        "editedInsights": [insight.line for insight in report_data.insights]
+    }
+
+def merge_image_reports(reports, test_keys=None):
+    """
+    Merge per-screenshot analysis results into one report payload
+    
+    Each per-image result carries the testData section(s) found in that
+    screenshot and one insight line per section, in the same order. The merged
+    insightLines are in test order and leave out tests without an insight;
+    insightKeys names the test each line belongs to.
+    
+    Args:
+        reports (list): Per-image payloads in upload order
+        test_keys (list): testData keys in report order, defaults to settings.TEST_DATA_KEYS
+    
+    Returns:
+        dict: Payload shaped like the single-upload webhook response
+    """
+    test_keys = test_keys or settings.TEST_DATA_KEYS
+    merged = {"studentInfo": {}, "testData": {}, "insightLines": [], "insightKeys": []}
+    insights_by_key = {}
+    
+    for report in reports:
+        if not merged["studentInfo"] and report.get("studentInfo"):
+            merged["studentInfo"] = report["studentInfo"]
+        
+        sections = [(key, rows) for key, rows in (report.get("testData") or {}).items() if rows]
+        insights = report.get("insightLines") or []
+        for index, (key, rows) in enumerate(sections):
+            # A test split across screenshots keeps the rows from every image
+            merged["testData"].setdefault(key, []).extend(rows)
+            if index < len(insights) and key not in insights_by_key:
+                insights_by_key[key] = insights[index]
+    
+    ordered_keys = list(test_keys) + [key for key in merged["testData"] if key not in test_keys]
+    merged["insightKeys"] = [key for key in ordered_keys if insights_by_key.get(key)]
+    merged["insightLines"] = [insights_by_key[key] for key in merged["insightKeys"]]
+    return merged
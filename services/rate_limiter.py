@@ -0,0 +1,185 @@
+import threading
+import time
+from contextlib import contextmanager
+from config import settings
+
+class AdmissionTimeoutError(Exception):
+    """Raised when a webhook call waited too long for a free slot"""
+
+# ─── TOKEN BUCKET ──────────────────────────────
+class TokenBucket:
+    """Process-wide request rate limit with bursts up to capacity"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def estimate_wait(self):
+        """Seconds until a token is available"""
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+    def acquire(self, deadline=None, on_wait=None):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise AdmissionTimeoutError("Too many requests are queued for the analysis service. Please try again shortly.")
+            if on_wait:
+                on_wait(wait)
+            time.sleep(wait)
+
+# ─── CONCURRENCY GOVERNOR ──────────────────────────────
+class ConcurrencyGovernor:
+    """
+    Per-endpoint caps on in-flight webhook calls, shared by all sessions.
+
+    Keeps a moving average of how long each endpoint's calls take so queued
+    callers can be told roughly how long they will wait.
+    """
+
+    def __init__(self, limits, default_limit, default_service_time):
+        self.limits = dict(limits)
+        self.default_limit = default_limit
+        self.default_service_time = default_service_time
+        self._active = {}
+        self._waiting = {}
+        self._service_time = {}
+        self._lock = threading.Lock()
+        self._conditions = {}  # One per endpoint, all sharing _lock, so a release wakes a caller for that endpoint
+
+    def limit_for(self, key):
+        return self.limits.get(key, self.default_limit)
+
+    def _condition_locked(self, key):
+        condition = self._conditions.get(key)
+        if condition is None:
+            condition = self._conditions[key] = threading.Condition(self._lock)
+        return condition
+
+    def _estimate_locked(self, key, ahead):
+        limit = self.limit_for(key)
+        if self._active.get(key, 0) < limit and ahead == 0:
+            return 0.0
+        average = self._service_time.get(key, self.default_service_time)
+        # Each "round" of limit callers ahead of us takes about one average call
+        return (ahead // limit + 1) * average
+
+    def estimate_wait(self, key):
+        """Seconds a new caller for this endpoint would wait for a slot"""
+        with self._lock:
+            return self._estimate_locked(key, self._waiting.get(key, 0))
+
+    def has_free_slot(self, key):
+        """True if a new caller for this endpoint would be admitted without queueing"""
+        with self._lock:
+            return self._active.get(key, 0) < self.limit_for(key) and not self._waiting.get(key, 0)
+
+    def _try_acquire_locked(self, key):
+        if self._active.get(key, 0) >= self.limit_for(key):
+            return False
+        self._active[key] = self._active.get(key, 0) + 1
+        return True
+
+    @contextmanager
+    def slot(self, key, deadline=None, on_wait=None):
+        """Hold one of the endpoint's concurrency slots for the duration of the block"""
+        with self._lock:
+            admitted = self._try_acquire_locked(key)
+            if not admitted:
+                ahead = self._waiting.get(key, 0)
+                self._waiting[key] = ahead + 1
+                estimate = self._estimate_locked(key, ahead)
+
+        if not admitted:
+            try:
+                while not admitted:
+                    # Outside the lock: on_wait may publish job state to a slow store
+                    if on_wait:
+                        on_wait(estimate)
+                    with self._lock:
+                        admitted = self._try_acquire_locked(key)
+                        if admitted:
+                            break
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise AdmissionTimeoutError("Too many requests are queued for the analysis service. Please try again shortly.")
+                        # Wake periodically so the wait estimate shown to the user stays fresh
+                        if self._condition_locked(key).wait(timeout=min(1.0, remaining) if remaining is not None else 1.0):
+                            ahead = max(0, ahead - 1)
+                        admitted = self._try_acquire_locked(key)
+                        estimate = self._estimate_locked(key, ahead)
+            finally:
+                with self._lock:
+                    self._waiting[key] -= 1
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._active[key] -= 1
+                previous = self._service_time.get(key, elapsed)
+                self._service_time[key] = 0.8 * previous + 0.2 * elapsed
+                self._condition_locked(key).notify()
+
+# ─── ADMISSION CONTROL ──────────────────────────────
+class AdmissionController:
+    """Token-bucket rate limit plus per-endpoint concurrency caps for N8NClient"""
+
+    def __init__(self, bucket=None, governor=None):
+        self.bucket = bucket or TokenBucket(settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST)
+        self.governor = governor or ConcurrencyGovernor(
+            settings.ENDPOINT_CONCURRENCY_LIMITS,
+            settings.DEFAULT_ENDPOINT_CONCURRENCY,
+            settings.ESTIMATED_CALL_SECONDS
+        )
+
+    def estimate_wait(self, key):
+        """Seconds a new call to this endpoint would currently queue for"""
+        return self.governor.estimate_wait(key) + self.bucket.estimate_wait()
+
+    @contextmanager
+    def admit(self, key, on_wait=None, timeout=None, on_admitted=None):
+        """
+        Wait for a concurrency slot and a rate-limit token, then run the block
+
+        Args:
+            key (str): Endpoint the call goes to
+            on_wait (callable): Called with the estimated seconds left while queued,
+                                then with 0 once admitted
+            timeout (float): Give up with AdmissionTimeoutError after this many seconds
+            on_admitted (callable): Called with no arguments once the call may start
+        """
+        timeout = settings.ADMISSION_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        queued = []
+
+        def report_wait(seconds):
+            queued.append(seconds)
+            if on_wait:
+                on_wait(seconds)
+
+        with self.governor.slot(key, deadline=deadline, on_wait=report_wait):
+            self.bucket.acquire(deadline=deadline, on_wait=report_wait)
+            if queued and on_wait:
+                # Let the caller clear its "waiting" display
+                on_wait(0)
+            if on_admitted:
+                on_admitted()
+            yield
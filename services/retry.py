@@ -0,0 +1,222 @@
+import math
+import random
+import threading
+import time
+import requests
+from config import settings
+from services.rate_limiter import AdmissionTimeoutError
+
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+# Responses that mean the request was turned away before being processed
+UNPROCESSED_STATUS_CODES = {429, 503}
+
+class CircuitOpenError(Exception):
+    """Raised without calling n8n while the circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"The analysis service is temporarily unavailable. Please try again in {max(1, math.ceil(retry_after))} seconds.")
+
+def is_retryable(error):
+    """Return True for transport failures and overload responses worth retrying"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.ChunkedEncodingError,
+        requests.exceptions.Timeout
+    ))
+
+def is_retryable_unprocessed(error):
+    """
+    Return True only for failures where the request cannot have been processed
+
+    Used for calls that must not run twice, e.g. a Google export that would
+    create a second document: a read timeout or a 502/504 may come after n8n
+    already received the body and ran the workflow.
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in UNPROCESSED_STATUS_CODES
+    return isinstance(error, requests.exceptions.ConnectTimeout)
+
+def retry_after_seconds(error):
+    """Return the server's Retry-After hint in seconds, if it sent one"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or getattr(error, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+# ─── BACKOFF POLICY ──────────────────────────────
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None, multiplier=2.0):
+        self.max_attempts = max_attempts or settings.MAX_RETRIES
+        self.base_delay = settings.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.multiplier = multiplier
+
+    def compute_delay(self, attempt, error=None):
+        """
+        Return how long to sleep before the given retry attempt
+
+        Args:
+            attempt (int): 1 for the first retry, 2 for the second, ...
+            error (Exception): The failure being retried, checked for Retry-After
+
+        Returns:
+            float: Delay in seconds
+        """
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        hint = retry_after_seconds(error) if error is not None else None
+        if hint is not None:
+            delay = max(delay, min(hint, self.max_delay))
+        return delay
+
+# ─── RETRY BUDGET ──────────────────────────────
+class RetryBudget:
+    """
+    Cap retries to a fraction of first attempts so a degraded n8n is not
+    hit with a multiple of the normal load.
+    """
+
+    def __init__(self, ratio=None, max_tokens=None):
+        self.ratio = settings.RETRY_BUDGET_RATIO if ratio is None else ratio
+        self.max_tokens = settings.RETRY_BUDGET_MAX_TOKENS if max_tokens is None else max_tokens
+        self._tokens = float(self.max_tokens)
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """Earn a fraction of a retry for every first attempt"""
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self):
+        """Spend one retry if the budget allows it"""
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+# ─── CIRCUIT BREAKER ──────────────────────────────
+class CircuitBreaker:
+    """
+    Fail fast after repeated failures, then let a single probe through once
+    the recovery timeout has passed.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=None, recovery_timeout=None):
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_FAILURE_THRESHOLD
+        self.recovery_timeout = recovery_timeout or settings.CIRCUIT_RECOVERY_TIMEOUT
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError if calls are currently being short-circuited"""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.recovery_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(remaining)
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(self.recovery_timeout)
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_neutral(self):
+        """An attempt that never reached n8n: no verdict, but let another probe through"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+# ─── RETRY ENGINE ──────────────────────────────
+class RetryEngine:
+    """Shared retry policy, budget and circuit breaker for every webhook call"""
+
+    def __init__(self, policy=None, budget=None, breaker=None):
+        self.policy = policy or RetryPolicy()
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+
+    def _record_outcome(self, error):
+        """Feed the breaker; only retryable failures count against n8n health"""
+        if error is None:
+            self.breaker.record_success()
+        elif isinstance(error, AdmissionTimeoutError):
+            # Queued locally and never sent, so it says nothing about n8n
+            self.breaker.record_neutral()
+        elif is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _next_delay(self, attempt, max_attempts, error, retry_unsafe=True):
+        """Return the delay before the next attempt, or None to give up"""
+        retryable = is_retryable(error) if retry_unsafe else is_retryable_unprocessed(error)
+        if not retryable or attempt >= max_attempts:
+            return None
+        if not self.budget.try_spend():
+            return None
+        return self.policy.compute_delay(attempt, error)
+
+    def call(self, func, max_attempts=None, on_retry=None, retry_unsafe=True):
+        """
+        Call func with retries, backoff and circuit breaking
+
+        Args:
+            func (callable): Performs one attempt and returns its result
+            max_attempts (int): Override the policy's attempt limit
+            on_retry (callable): Called with (attempt, delay, error) before sleeping
+            retry_unsafe (bool): False for calls that must not run twice; only
+                                 failures where the request was not processed are retried
+
+        Returns:
+            The result of the first successful attempt
+        """
+        max_attempts = max_attempts or self.policy.max_attempts
+        self.budget.record_request()
+
+        attempt = 1
+        while True:
+            self.breaker.before_call()
+            try:
+                result = func()
+            except Exception as e:
+                self._record_outcome(e)
+                delay = self._next_delay(attempt, max_attempts, e, retry_unsafe)
+                if delay is None:
+                    raise
+                if on_retry:
+                    on_retry(attempt + 1, delay, e)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._record_outcome(None)
+            return result
@@ -0,0 +1,146 @@
+import io
+import sys
+import threading
+import time
+from config import settings
+
+# Memory accounting and idle eviction across the Streamlit sessions served by
+# this process. Each session registers its session state on every rerun; a
+# sweep drops the heavy keys of sessions idle longer than
+# settings.SESSION_IDLE_TIMEOUT (they are reloaded from the session store when
+# the session comes back) and forgets them, so closed sessions are not kept
+# alive by the registry. report() sizes every recently active session.
+# claim() binds each session ID to the browser connection using it, so a
+# second open tab with the same sid can be told apart from a refresh.
+
+def estimate_size(value, seen=None):
+    """
+    Approximate bytes held by an object graph
+
+    Objects reachable more than once (e.g. subtrees shared between edit
+    versions) are counted once; file buffers count their contents.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, io.BytesIO):
+        with value.getbuffer() as buffer:
+            return size + buffer.nbytes
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(item, seen) for item in value)
+
+    for cls in type(value).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            if hasattr(value, slot):
+                size += estimate_size(getattr(value, slot), seen)
+    if hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), seen)
+    return size
+
+class SessionMemory:
+    """Registry of live sessions' state with last activity times"""
+
+    def __init__(self):
+        self._sessions = {}  # session_id -> (session state, last seen)
+        self._owners = {}  # session_id -> Streamlit connection that claimed it
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.evictions = 0
+
+    def touch(self, session_id, state):
+        """Record activity; state is the script run's SafeSessionState, not the st.session_state proxy"""
+        with self._lock:
+            self._sessions[session_id] = (state, time.time())
+
+    def claim(self, session_id, owner, is_live):
+        """
+        Bind a session ID to the connection using it
+
+        Args:
+            session_id (str): The sid
+            owner (str): Streamlit's ID for this browser connection
+            is_live (callable): owner -> bool, whether a connection is still open
+
+        Returns:
+            bool: False if another connection that is still open holds the sid
+        """
+        with self._lock:
+            holder = self._owners.get(session_id)
+            if holder is not None and holder != owner and is_live(holder):
+                return False
+            self._owners[session_id] = owner
+            return True
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self, keys, idle_seconds=None, is_live=None):
+        """
+        Drop keys from the state of sessions idle for longer than idle_seconds
+        and stop tracking them until their next rerun
+
+        Runs at most once per settings.SESSION_EVICT_INTERVAL. The registry lock
+        is held throughout, so a session that touch()es concurrently is either
+        seen as active or finds its keys already gone and reloads them. Claims
+        held by connections is_live() reports closed are released too.
+
+        Returns:
+            list: IDs of the sessions that lost keys
+        """
+        idle_seconds = idle_seconds or settings.SESSION_IDLE_TIMEOUT
+        now = time.time()
+        evicted = []
+        with self._lock:
+            if now - self._last_sweep < settings.SESSION_EVICT_INTERVAL:
+                return evicted
+            self._last_sweep = now
+            for session_id, (state, last_seen) in list(self._sessions.items()):
+                if now - last_seen < idle_seconds:
+                    continue
+                del self._sessions[session_id]
+                dropped = False
+                for key in keys:
+                    if key in state:
+                        del state[key]
+                        dropped = True
+                if dropped:
+                    evicted.append(session_id)
+            if is_live is not None:
+                for session_id, owner in list(self._owners.items()):
+                    if not is_live(owner):
+                        del self._owners[session_id]
+            self.evictions += len(evicted)
+        return evicted
+
+    def report(self):
+        """
+        Size each live session's state
+
+        Returns:
+            list: {"session_id", "idle_seconds", "total_bytes", "keys": {key: bytes}}
+                  dicts, largest session first
+        """
+        now = time.time()
+        with self._lock:
+            live = list(self._sessions.items())
+        rows = []
+        for session_id, (state, last_seen) in live:
+            keys = {key: estimate_size(value) for key, value in state.filtered_state.items()}
+            rows.append({
+                "session_id": session_id,
+                "idle_seconds": now - last_seen,
+                "total_bytes": sum(keys.values()),
+                "keys": keys
+            })
+        return sorted(rows, key=lambda row: row["total_bytes"], reverse=True)
+
+# Create singleton instance
+session_memory = SessionMemory()
@@ -0,0 +1,340 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config import settings
+from services.cache import DiskCache
+
+# Durable copy of each session's form data, report and career analysis, so a
+# browser refresh, server restart or redeploy reconnects to finished work
+# instead of re-running the n8n analysis. session_manager writes through on
+# every change and reads a row back only when a session reconnects by its sid.
+#
+# Background job state is kept here too, so with several Streamlit worker
+# processes any of them can show a job another one is running. The backend is
+# picked by settings.SESSION_STORE_BACKEND:
+#   "sqlite" - SessionStore, one WAL database shared by workers on one host
+#   "file"   - KeyValueSessionStore over JSON files (e.g. a shared volume)
+#   "server" - KeyValueSessionStore over the HTTP key-value API of
+#              scripts/state_server.py, a stand-in for a Redis-style service
+
+class StoreConflictError(Exception):
+    """A compare-and-set write kept losing to other writers"""
+
+# Errors a store can raise, including values JSON can't encode; callers
+# degrade to in-memory state on these
+STORE_ERRORS = (sqlite3.Error, OSError, TypeError, ValueError, requests.exceptions.RequestException, StoreConflictError)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    student_name TEXT,
+    form TEXT,
+    report TEXT,
+    saved_report TEXT,
+    career TEXT,
+    saved_career TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_student ON sessions (student_name COLLATE NOCASE, updated_at);
+CREATE INDEX IF NOT EXISTS sessions_by_age ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS jobs (
+    session_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (session_id, kind)
+);
+"""
+
+DOCUMENT_COLUMNS = ("form", "report", "saved_report", "career", "saved_career")
+
+class SessionStore:
+    """SQLite (WAL mode) table of sessions, one connection per thread"""
+
+    def __init__(self, path=None, retention=None):
+        """
+        Args:
+            path (str): Database file, default settings.SESSION_DB_FILE inside settings.CACHE_DIR
+            retention (float): Seconds an untouched session is kept, None to keep everything
+        """
+        self._path = path
+        self.retention = retention if retention is not None else settings.SESSION_RETENTION
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = set()
+
+    @property
+    def path(self):
+        return self._path or os.path.join(settings.CACHE_DIR, settings.SESSION_DB_FILE)
+
+    def _connect(self):
+        path = self.path
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.path == path:
+            return connection
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        connection = sqlite3.connect(path, timeout=settings.SESSION_DB_BUSY_TIMEOUT, isolation_level=None)
+        # WAL lets every Streamlit thread read while one writes; NORMAL sync is
+        # durable across app crashes and only risks the last commit on power loss
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if path not in self._initialized:
+                connection.executescript(SCHEMA)
+                self._prune(connection)
+                self._initialized.add(path)
+        self._local.connection = connection
+        self._local.path = path
+        return connection
+
+    def _prune(self, connection):
+        if self.retention is not None:
+            cutoff = time.time() - self.retention
+            connection.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+            connection.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,))
+
+    def save(self, session_id, student_name=None, **documents):
+        """
+        Write some of a session's documents, leaving the other columns as they are
+
+        Args:
+            session_id (str): The session's sid
+            student_name (str): Name to index the session under, None to keep the current one
+            **documents: form, report, saved_report, career and/or saved_career
+                         as JSON-serializable values (None clears a column)
+        """
+        unknown = set(documents) - set(DOCUMENT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown session columns: {sorted(unknown)}")
+
+        columns = {name: None if value is None else json.dumps(value) for name, value in documents.items()}
+        if student_name is not None:
+            columns["student_name"] = student_name
+        columns["updated_at"] = time.time()
+
+        names = ", ".join(columns)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in columns)
+        self._connect().execute(
+            f"INSERT INTO sessions (session_id, {names}) VALUES (?, {placeholders}) "
+            f"ON CONFLICT (session_id) DO UPDATE SET {updates}",
+            (session_id, *columns.values())
+        )
+
+    def load(self, session_id):
+        """
+        Read a session back
+
+        Returns:
+            dict: Decoded documents keyed by column name plus student_name and
+                  updated_at, or None if the session is unknown
+        """
+        row = self._connect().execute(
+            f"SELECT student_name, updated_at, {', '.join(DOCUMENT_COLUMNS)} FROM sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = {"student_name": row[0], "updated_at": row[1]}
+        for name, value in zip(DOCUMENT_COLUMNS, row[2:]):
+            record[name] = None if value is None else json.loads(value)
+        return record
+
+    def find_by_student(self, student_name, limit=20):
+        """Most recently updated (session_id, updated_at) pairs for a student, case-insensitive"""
+        return self._connect().execute(
+            "SELECT session_id, updated_at FROM sessions WHERE student_name = ? COLLATE NOCASE "
+            "ORDER BY updated_at DESC LIMIT ?",
+            (student_name, limit)
+        ).fetchall()
+
+    def delete(self, session_id):
+        self._connect().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def save_job(self, session_id, kind, state):
+        """Write a background job's JSON-serializable state"""
+        self._connect().execute(
+            "INSERT INTO jobs (session_id, kind, state, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (session_id, kind) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+            (session_id, kind, json.dumps(state), time.time())
+        )
+
+    def load_job(self, session_id, kind):
+        """Read a job's state, or None"""
+        row = self._connect().execute(
+            "SELECT state FROM jobs WHERE session_id = ? AND kind = ?", (session_id, kind)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def delete_jobs(self, session_id, kind=None):
+        """Forget a session's job of a kind, or all of its jobs when kind is None"""
+        if kind is None:
+            self._connect().execute("DELETE FROM jobs WHERE session_id = ?", (session_id,))
+        else:
+            self._connect().execute("DELETE FROM jobs WHERE session_id = ? AND kind = ?", (session_id, kind))
+
+# ─── KEY-VALUE BACKENDS ──────────────────────────────
+def _key(kind, value):
+    """Store key safe for file names and URLs, whatever the sid or name contains"""
+    return f"{kind}-{hashlib.sha256(str(value).encode()).hexdigest()[:40]}"
+
+class RemoteKV:
+    """Client for the key-value HTTP API of scripts/state_server.py"""
+
+    def __init__(self, base_url=None, timeout=None):
+        self.base_url = (base_url or settings.STATE_SERVER_URL).rstrip("/")
+        self.timeout = timeout or settings.STATE_SERVER_TIMEOUT
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.POOL_MAX_PER_HOST)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, key, default=None):
+        response = self.session.get(f"{self.base_url}/kv/{key}", timeout=self.timeout)
+        if response.status_code == 404:
+            return default
+        response.raise_for_status()
+        return response.json()
+
+    def set(self, key, value):
+        self.session.put(f"{self.base_url}/kv/{key}", json=value, timeout=self.timeout).raise_for_status()
+
+    def delete(self, key):
+        response = self.session.delete(f"{self.base_url}/kv/{key}", timeout=self.timeout)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    def update(self, key, func):
+        """
+        Read-modify-write one value with compare-and-set, retrying when another writer got there first
+
+        Args:
+            key (str): Value to update
+            func (callable): Receives the current value (None if missing) and
+                             returns the new one, or None to delete it
+
+        Returns:
+            The new value
+        """
+        url = f"{self.base_url}/kv/{key}"
+        for attempt in range(settings.STATE_SERVER_UPDATE_ATTEMPTS):
+            if attempt:
+                # Jittered backoff so two writers in step don't keep colliding
+                time.sleep(random.uniform(0, 0.01 * attempt))
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code == 404:
+                current, condition = None, {"If-None-Match": "*"}
+            else:
+                response.raise_for_status()
+                current, condition = response.json(), {"If-Match": response.headers["ETag"]}
+
+            value = func(current)
+            if value is None:
+                if current is None:
+                    return None
+                response = self.session.delete(url, headers=condition, timeout=self.timeout)
+            else:
+                response = self.session.put(url, json=value, headers=condition, timeout=self.timeout)
+            if response.status_code == 412:
+                continue
+            if response.status_code != 404:
+                response.raise_for_status()
+            return value
+        raise StoreConflictError(f"Gave up updating {key} after {settings.STATE_SERVER_UPDATE_ATTEMPTS} conflicts")
+
+class KeyValueSessionStore:
+    """
+    SessionStore API over any get/set/delete/update key-value backend
+
+    A session is one record holding all its columns, a session's jobs share
+    one record keyed by kind, and each student name has a record mapping
+    session IDs to their last update for find_by_student(). Every change to
+    a record goes through the backend's atomic update(), so concurrent jobs
+    and workers writing to one record never drop each other's changes.
+    """
+
+    def __init__(self, kv):
+        self.kv = kv
+
+    def save(self, session_id, student_name=None, **documents):
+        """Write some of a session's documents; see SessionStore.save()"""
+        unknown = set(documents) - set(DOCUMENT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown session columns: {sorted(unknown)}")
+
+        def apply(record):
+            record = record or {"student_name": None, **{name: None for name in DOCUMENT_COLUMNS}}
+            record.update(documents)
+            if student_name is not None:
+                record["student_name"] = student_name
+            record["updated_at"] = time.time()
+            return record
+
+        record = self.kv.update(_key("session", session_id), apply)
+        if record["student_name"]:
+            self.kv.update(
+                _key("student", record["student_name"].lower()),
+                lambda index: {**(index or {}), session_id: record["updated_at"]}
+            )
+
+    def load(self, session_id):
+        return self.kv.get(_key("session", session_id))
+
+    def find_by_student(self, student_name, limit=20):
+        index = self.kv.get(_key("student", student_name.lower())) or {}
+        return sorted(index.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def delete(self, session_id):
+        key = _key("session", session_id)
+        record = self.kv.get(key)
+        if record and record.get("student_name"):
+            self.kv.update(
+                _key("student", record["student_name"].lower()),
+                lambda index: {sid: updated for sid, updated in (index or {}).items() if sid != session_id} or None
+            )
+        self.kv.delete(key)
+
+    def save_job(self, session_id, kind, state):
+        self.kv.update(_key("jobs", session_id), lambda jobs: {**(jobs or {}), kind: state})
+
+    def load_job(self, session_id, kind):
+        return (self.kv.get(_key("jobs", session_id)) or {}).get(kind)
+
+    def delete_jobs(self, session_id, kind=None):
+        key = _key("jobs", session_id)
+        if kind is None:
+            self.kv.delete(key)
+            return
+        self.kv.update(key, lambda jobs: {name: state for name, state in (jobs or {}).items() if name != kind} or None)
+
+def create_session_store(backend=None):
+    """
+    Build the session store for settings.SESSION_STORE_BACKEND
+
+    Args:
+        backend (str): "sqlite", "file" or "server", overriding the setting
+
+    Returns:
+        SessionStore or KeyValueSessionStore
+    """
+    backend = backend or settings.SESSION_STORE_BACKEND
+    if backend == "sqlite":
+        return SessionStore()
+    if backend == "file":
+        return KeyValueSessionStore(DiskCache(
+            settings.SESSION_FILE_DIR or os.path.join(settings.CACHE_DIR, "sessions"),
+            ttl=settings.SESSION_RETENTION
+        ))
+    if backend == "server":
+        return KeyValueSessionStore(RemoteKV())
+    raise ValueError(f"Unknown session store backend: {backend}")
+
+# Create singleton instance
+session_store = create_session_store()
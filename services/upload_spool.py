@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+import time
+from config import settings
+
+# Content-addressed disk spool for uploaded screenshots. Once a report is
+# stored the session keeps only SpooledUpload references (name, type, size and
+# digest), so the image bytes stop counting against the Streamlit worker's
+# memory; identical screenshots uploaded by several sessions share one file.
+
+CHUNK_SIZE = 64 * 1024
+
+class SpooledUpload:
+    """
+    Reference to an uploaded file in the spool, with the UploadedFile name and type
+
+    Also reads like an UploadedFile (seek/read/tell), from the spooled file,
+    so a session that reconnects with spooled screenshots can re-run its
+    report job. The file is opened on first read and closed by close().
+    """
+
+    __slots__ = ("name", "type", "size", "digest", "path", "_file")
+
+    def __init__(self, name, type, size, digest, path):
+        self.name = name
+        self.type = type
+        self.size = size
+        self.digest = digest
+        self.path = path
+        self._file = None
+
+    def open(self):
+        """Open the spooled bytes for reading; raises FileNotFoundError once evicted"""
+        return open(self.path, "rb")
+
+    def _reader(self):
+        if self._file is None:
+            self._file = self.open()
+        return self._file
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._reader().seek(offset, whence)
+
+    def tell(self):
+        return self._reader().tell()
+
+    def read(self, size=-1):
+        return self._reader().read(size)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def to_dict(self):
+        return {"name": self.name, "type": self.type, "size": self.size, "digest": self.digest}
+
+class UploadSpool:
+    """Directory of uploads named by SHA-256, expired by age"""
+
+    def __init__(self, directory=None, ttl=None):
+        """
+        Args:
+            directory (str): Spool folder, default settings.UPLOAD_SPOOL_DIR inside settings.CACHE_DIR
+            ttl (float): Seconds a spooled file is kept after it was last written
+        """
+        self._directory = directory
+        self.ttl = ttl if ttl is not None else settings.UPLOAD_SPOOL_TTL
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return self._directory or os.path.join(settings.CACHE_DIR, settings.UPLOAD_SPOOL_DIR)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def spill(self, uploaded_files):
+        """
+        Write uploads to the spool
+
+        Args:
+            uploaded_files (list): Streamlit UploadedFile objects (or any seekable file with name/type)
+
+        Returns:
+            list: SpooledUpload references in the same order
+        """
+        spooled = [self._spill_one(f) for f in uploaded_files]
+        self.evict()
+        return spooled
+
+    def _spill_one(self, f):
+        digest = hashlib.sha256()
+        size = 0
+        f.seek(0)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+        digest = digest.hexdigest()
+
+        path = self._path(digest)
+        if os.path.exists(path):
+            # Already spooled by this or another session; restart its TTL
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            f.seek(0)
+            with open(temp_path, "wb") as out:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    out.write(chunk)
+            os.replace(temp_path, path)
+        f.seek(0)
+        return SpooledUpload(f.name, f.type, size, digest, path)
+
+    def get(self, data):
+        """Rebuild a SpooledUpload from to_dict() output, or None if the file was evicted"""
+        path = self._path(data["digest"])
+        if not os.path.exists(path):
+            return None
+        return SpooledUpload(data["name"], data["type"], data["size"], data["digest"], path)
+
+    def evict(self):
+        """Remove spooled files older than the TTL"""
+        if not os.path.isdir(self.directory):
+            return
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                    except OSError:
+                        pass
+
+    def usage(self):
+        """Return the number of spooled files and their total size in bytes"""
+        files = total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                    files += 1
+                except OSError:
+                    pass
+        return {"files": files, "bytes": total}
+
+# Create singleton instance
+upload_spool = UploadSpool()
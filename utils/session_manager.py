@@ -1,33 +1,98 @@
+import uuid
 import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from config import settings
+from services.job_runner import job_runner
+from services.models import Report, CareerAnalysis
+from services.session_memory import session_memory
+from services.session_store import DOCUMENT_COLUMNS, STORE_ERRORS, session_store
+from services.upload_spool import SpooledUpload, upload_spool
+from utils.versioned_store import VersionedStore
+
+def get_session_id():
+    """
+    Get the ID background jobs are stored under
+    
+    It is kept in the URL so a browser refresh reconnects to in-flight jobs.
+    A sid another open tab is still using gets forked: this tab continues on
+    a copy under a new sid, so the two don't overwrite each other's edits.
+    """
+    if 'session_id' not in st.session_state:
+        session_id = st.query_params.get("sid")
+        if session_id and not _claim(session_id):
+            session_id = _fork_session(session_id)
+            st.query_params["sid"] = session_id
+        if not session_id:
+            session_id = uuid.uuid4().hex
+            st.query_params["sid"] = session_id
+            _claim(session_id)
+        st.session_state.session_id = session_id
+    return st.session_state.session_id
+
+def _is_live_connection(connection_id):
+    return Runtime.exists() and Runtime.instance().is_active_session(connection_id)
+
+def _claim(session_id):
+    """Bind the sid to this browser connection; False if another open tab holds it"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return True
+    return session_memory.claim(session_id, ctx.session_id, _is_live_connection)
+
+def _fork_session(session_id):
+    """Copy a stored session to a new sid claimed by this tab, and return the new sid"""
+    fork_id = uuid.uuid4().hex
+    _claim(fork_id)
+    if not settings.SESSION_STORE_ENABLED:
+        return fork_id
+    try:
+        record = session_store.load(session_id)
+        if record is not None:
+            session_store.save(fork_id, student_name=record["student_name"],
+                               **{column: record[column] for column in DOCUMENT_COLUMNS})
+    except STORE_ERRORS:
+        # The new tab starts empty rather than sharing the other tab's session
+        pass
+    return fork_id
+
+# Dropped from sessions idle for SESSION_IDLE_TIMEOUT; restore_session() reloads them
+EVICTABLE_KEYS = ('edit_store',)
 
 def initialize_session():
     """Initialize all session state variables"""
     
+    track_session_memory(get_session_id())
+    
     # Form and processing states
     if 'form_submitted' not in st.session_state:
         st.session_state.form_submitted = False
-    if 'report_data' not in st.session_state:
-        st.session_state.report_data = None
-    if 'original_data' not in st.session_state:
-        st.session_state.original_data = None
+    # Report and career analysis versions: {"report": Report, "career": CareerAnalysis or None}
+    if 'edit_store' not in st.session_state:
+        st.session_state.edit_store = None
+        restore_session()
     
     # Edit mode
     if 'edit_mode' not in st.session_state:
         st.session_state.edit_mode = False
     
     # Career analysis
-    if 'career_data' not in st.session_state:
-        st.session_state.career_data = None
     if 'career_analysis_requested' not in st.session_state:
         st.session_state.career_analysis_requested = False
-    if 'original_career_data' not in st.session_state:
-        st.session_state.original_career_data = None
+    if 'career_force_refresh' not in st.session_state:
+        st.session_state.career_force_refresh = False
     
     # Google export
     if 'google_authenticated' not in st.session_state:
         st.session_state.google_authenticated = False
     if 'export_requested' not in st.session_state:
         st.session_state.export_requested = False
+    
+    # Reconnect to work started before a browser refresh
+    if not st.session_state.form_submitted and get_job('report') is not None:
+        st.session_state.form_submitted = True
+    if not st.session_state.career_analysis_requested and get_job('career') is not None:
+        st.session_state.career_analysis_requested = True
 
 # ─── STATE CHECKERS ──────────────────────────────
 def is_form_submitted():
@@ -36,11 +101,11 @@ def is_form_submitted():
 
 def has_report_data():
     """Check if report data exists"""
-    return st.session_state.report_data is not None
+    return st.session_state.edit_store is not None
 
 def has_career_data():
     """Check if career data exists"""
-    return st.session_state.career_data is not None
+    return get_career_data() is not None
 
 def is_edit_mode():
     """Check if in edit mode"""
@@ -48,7 +113,11 @@ def is_edit_mode():
 
 def is_processing_career_analysis():
     """Check if career analysis is being processed"""
-    return st.session_state.career_analysis_requested and not st.session_state.career_data
+    return st.session_state.career_analysis_requested and not has_career_data()
+
+def is_career_refresh_forced():
+    """Check if the next career analysis must bypass the cache"""
+    return st.session_state.career_force_refresh
 
 def is_google_authenticated():
     """Check if Google is authenticated"""
@@ -62,6 +131,7 @@ def store_form_data(name, age, grade, uploaded_files):
     st.session_state.grade = grade
     st.session_state.uploaded_files = uploaded_files
     st.session_state.form_submitted = True
+    _persist(student_name=name, form={'name': name, 'age': age, 'grade': grade})
 
 def get_form_data():
     """Get stored form data"""
@@ -74,22 +144,26 @@ def get_form_data():
 
 # ─── REPORT DATA MANAGEMENT ──────────────────────────
 def store_report_data(data):
-    """Store report data and create backup"""
-    st.session_state.report_data = data
-    st.session_state.original_data = data.copy()
+    """Store the parsed Report as the first saved version of a new edit history"""
+    st.session_state.edit_store = VersionedStore({"report": data, "career": None})
+    _persist_versions("report", "career", saved=True, student_name=data.student_info.get('name'))
+    release_uploads()
 
 def get_report_data():
-    """Get current report data"""
-    return st.session_state.report_data
+    """Get the current Report, or None; edit it through edit_report()"""
+    store = st.session_state.edit_store
+    return store.current["report"] if store else None
+
+def get_original_report_data():
+    """Get the Report as last stored or saved, before any unsaved edits"""
+    store = st.session_state.edit_store
+    return store.saved["report"] if store else None
 
 def get_student_info():
     """Get student info from report data or form data"""
-    if st.session_state.report_data:
-        return st.session_state.report_data.get("studentInfo", {
-            "name": getattr(st.session_state, 'name', 'Unknown'),
-            "age": getattr(st.session_state, 'age', 'Unknown'),
-            "grade": getattr(st.session_state, 'grade', 'Unknown'),
-        })
+    report = get_report_data()
+    if report and report.student_info:
+        return report.student_info
     else:
         return {
             "name": getattr(st.session_state, 'name', 'Unknown'),
@@ -99,46 +173,86 @@ def get_student_info():
 
 # ─── CAREER DATA MANAGEMENT ──────────────────────────
 def store_career_data(data):
-    """Store career data and create backup"""
-    st.session_state.career_data = data
-    if data:  # Only create backup if data exists
-        st.session_state.original_career_data = data.copy()
+    """Store the parsed CareerAnalysis as saved; the edit history starts over"""
+    st.session_state.edit_store.load(("career",), data)
+    _persist_versions("career", saved=True)
     st.session_state.career_analysis_requested = False
+    st.session_state.career_force_refresh = False
 
 def get_career_data():
-    """Get current career data"""
-    return st.session_state.career_data
+    """Get the current CareerAnalysis, or None; edit it through edit_career()"""
+    store = st.session_state.edit_store
+    return store.current["career"] if store else None
+
+def get_original_career_data():
+    """Get the CareerAnalysis as last stored or saved, before any unsaved edits"""
+    store = st.session_state.edit_store
+    return store.saved["career"] if store else None
 
 def request_career_analysis():
     """Request career analysis"""
     st.session_state.career_analysis_requested = True
 
-def request_career_reanalysis():
-    """Request career reanalysis"""
-    st.session_state.career_data = None
+def request_career_reanalysis(force_refresh=False):
+    """Request career reanalysis, optionally bypassing the cached result"""
+    st.session_state.edit_store.load(("career",), None)
+    _persist_versions("career", saved=True)
     st.session_state.career_analysis_requested = True
+    st.session_state.career_force_refresh = force_refresh
 
 # ─── EDIT MODE MANAGEMENT ──────────────────────────
 def toggle_edit_mode():
     """Toggle edit mode on/off"""
     st.session_state.edit_mode = not st.session_state.edit_mode
 
-def reset_changes():
-    """Reset all changes to original data"""
-    if st.session_state.original_data:
-        st.session_state.report_data = st.session_state.original_data.copy()
+def edit_report(path, value, shown=None):
+    """
+    Record an edit to the current report as a new version
     
-    if hasattr(st.session_state, 'original_career_data') and st.session_state.original_career_data:
-        st.session_state.career_data = st.session_state.original_career_data.copy()
+    Args:
+        path (tuple): Attribute, key and index path inside the Report,
+                      e.g. ("test_data", "high5Data", 0, "meaning")
+        value: The widget's value
+        shown: Placeholder the widget displayed instead of the stored value;
+               getting it back is not an edit
+    """
+    if (shown is None or value != shown) and st.session_state.edit_store.set(("report", *path), value):
+        _persist_versions("report")
+
+def edit_career(path, value, shown=None):
+    """Record an edit to the current career analysis; see edit_report()"""
+    if (shown is None or value != shown) and st.session_state.edit_store.set(("career", *path), value):
+        _persist_versions("career")
+
+def edit_key(name):
+    """Widget key that changes when undo, redo or reset moves to another version"""
+    return f"{name}_v{st.session_state.edit_store.epoch}"
+
+def can_undo():
+    return st.session_state.edit_store.can_undo
+
+def can_redo():
+    return st.session_state.edit_store.can_redo
+
+def undo_change():
+    """Step back one edit"""
+    st.session_state.edit_store.undo()
+    _persist_versions("report", "career")
+
+def redo_change():
+    """Step forward one undone edit"""
+    st.session_state.edit_store.redo()
+    _persist_versions("report", "career")
+
+def reset_changes():
+    """Return to the last saved report and career analysis (undoable)"""
+    st.session_state.edit_store.reset()
+    _persist_versions("report", "career")
 
 def save_changes():
-    """Save current changes as new original"""
-    if st.session_state.report_data:
-        st.session_state.original_data = st.session_state.report_data.copy()
-    
-    if st.session_state.career_data:
-        st.session_state.original_career_data = st.session_state.career_data.copy()
-    
+    """Save current changes as the version to reset to"""
+    st.session_state.edit_store.mark_saved()
+    _persist_versions("report", "career", saved=True)
     st.session_state.edit_mode = False
 
 # ─── GOOGLE EXPORT MANAGEMENT ──────────────────────────
@@ -150,11 +264,145 @@ def request_export():
     """Request export to Google Docs"""
     st.session_state.export_requested = True
 
+# ─── BACKGROUND JOB MANAGEMENT ──────────────────────────
+def start_job(kind, func):
+    """Run func(job) in the background for this session (no-op if one is running)"""
+    return job_runner.submit(get_session_id(), kind, func)
+
+def get_job(kind):
+    """Get this session's latest background job of a kind, or None"""
+    return job_runner.get(get_session_id(), kind)
+
+def clear_job(kind):
+    """Forget this session's job of a kind once its result has been used"""
+    job_runner.clear(get_session_id(), kind)
+
+# ─── PERSISTENCE ──────────────────────────────
+def _persist(student_name=None, **documents):
+    """Write documents of this session through to the session store"""
+    if not settings.SESSION_STORE_ENABLED:
+        return
+    try:
+        session_store.save(get_session_id(), student_name=student_name, **documents)
+    except STORE_ERRORS:
+        # The in-memory session keeps working; only recovery after a restart is lost
+        pass
+
+def _persist_versions(*parts, saved=False, student_name=None):
+    """
+    Write the current (and optionally saved) report and/or career analysis
+    
+    Args:
+        *parts: "report" and/or "career"
+        saved (bool): Also write the saved versions Reset Changes returns to
+        student_name (str): Name to index the session under, None to keep the current one
+    """
+    store = st.session_state.edit_store
+    documents = {}
+    for part in parts:
+        documents[part] = _to_dict(store.current[part])
+        if saved:
+            documents[f"saved_{part}"] = _to_dict(store.saved[part])
+    _persist(student_name=student_name, **documents)
+
+def _to_dict(model):
+    return None if model is None else model.to_dict()
+
+def _restore_pair(current, saved, model):
+    """Parse stored current and saved documents, sharing one object when they are equal"""
+    current_model = model.from_dict(current) if current is not None else None
+    if saved == current:
+        return current_model, current_model
+    return current_model, model.from_dict(saved) if saved is not None else None
+
+def restore_session():
+    """
+    Reload this session's report, career analysis and unsaved edits after a
+    refresh or restart, by the sid in the URL
+    
+    Undo history is not persisted; the restored current version starts a new one.
+    """
+    if not settings.SESSION_STORE_ENABLED:
+        return
+    try:
+        record = session_store.load(get_session_id())
+    except STORE_ERRORS:
+        return
+    if record is None:
+        return
+    
+    form = record["form"] or {}
+    st.session_state.name = form.get('name', '')
+    st.session_state.age = form.get('age', 0)
+    st.session_state.grade = form.get('grade', '')
+    spooled = [upload_spool.get(upload) for upload in form.get('uploads', [])]
+    st.session_state.uploaded_files = [upload for upload in spooled if upload is not None]
+    if record["report"] is None:
+        return
+    
+    report, saved_report = _restore_pair(record["report"], record["saved_report"], Report)
+    career, saved_career = _restore_pair(record["career"], record["saved_career"], CareerAnalysis)
+    current = {"report": report, "career": career}
+    saved = {"report": saved_report, "career": saved_career}
+    if report is saved_report and career is saved_career:
+        saved = current
+    st.session_state.edit_store = VersionedStore(current, saved=saved)
+    st.session_state.form_submitted = True
+
+# ─── MEMORY MANAGEMENT ──────────────────────────────
+def track_session_memory(session_id):
+    """Record this rerun for idle eviction and the memory view, then sweep idle sessions"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    session_memory.touch(session_id, ctx.session_state)
+    # Without a store to reload from, only the tab claims are swept
+    evictable = EVICTABLE_KEYS if settings.SESSION_STORE_ENABLED else ()
+    session_memory.evict_idle(evictable, is_live=_is_live_connection)
+
+def release_uploads():
+    """
+    Replace the uploaded screenshots in session state with spool references,
+    or drop them when settings.UPLOAD_SPOOL_ENABLED is off
+    """
+    uploaded_files = getattr(st.session_state, 'uploaded_files', None) or []
+    if not settings.UPLOAD_SPOOL_ENABLED:
+        st.session_state.uploaded_files = []
+        return
+    
+    for f in uploaded_files:
+        if isinstance(f, SpooledUpload):
+            # Read back for a re-run report job; the report is stored now
+            f.close()
+    fresh = [f for f in uploaded_files if not isinstance(f, SpooledUpload)]
+    if not fresh:
+        return
+    try:
+        spooled = upload_spool.spill(fresh)
+    except OSError:
+        # A full or read-only disk must not keep the bytes in memory either
+        st.session_state.uploaded_files = []
+        return
+    st.session_state.uploaded_files = spooled
+    _persist(form={
+        'name': getattr(st.session_state, 'name', ''),
+        'age': getattr(st.session_state, 'age', 0),
+        'grade': getattr(st.session_state, 'grade', ''),
+        'uploads': [upload.to_dict() for upload in spooled]
+    })
+
 # ─── RESET FUNCTIONS ──────────────────────────────
 def reset_all():
     """Reset entire application state"""
+    job_runner.clear(get_session_id())
+    if settings.SESSION_STORE_ENABLED:
+        try:
+            session_store.delete(get_session_id())
+        except STORE_ERRORS:
+            pass
     for key in list(st.session_state.keys()):
-        del st.session_state[key]
+        if key != 'session_id':
+            del st.session_state[key]
 
 def reset_form():
     """Reset form submission state"""
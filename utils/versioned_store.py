@@ -0,0 +1,141 @@
+import copy
+from config import settings
+
+# Versioned edit history for the session's report and career analysis.
+# Versions are never modified once stored: an edit copies only the objects on
+# the path to the changed value and shares every other subtree with the
+# previous version, so snapshots, undo and reset cost O(depth), not a deep
+# copy of the report. Paths mix attribute names, dict keys and list indexes,
+# e.g. ("report", "test_data", "high5Data", 0, "meaning").
+
+def _get_child(node, step):
+    if isinstance(node, (dict, list)):
+        return node[step]
+    return getattr(node, step)
+
+def _set_child(node, step, value):
+    if isinstance(node, (dict, list)):
+        node[step] = value
+    else:
+        setattr(node, step, value)
+
+def _shallow_copy(node):
+    if isinstance(node, dict):
+        return dict(node)
+    if isinstance(node, list):
+        return list(node)
+    return copy.copy(node)
+
+def get_in(document, path):
+    """Value at path in a document"""
+    for step in path:
+        document = _get_child(document, step)
+    return document
+
+def assoc_in(document, path, value):
+    """
+    New version of document with value at path
+
+    Only the containers along the path are copied; everything else is shared
+    with the original, which is left untouched.
+    """
+    if not path:
+        return value
+    node = _shallow_copy(document)
+    step = path[0]
+    _set_child(node, step, assoc_in(_get_child(document, step), path[1:], value))
+    return node
+
+class VersionedStore:
+    """
+    Undoable history of document versions with a saved version to reset to
+
+    Callers must treat current and saved as read-only and change them only
+    through set(), so versions sharing a subtree never see each other's edits.
+    """
+
+    def __init__(self, document, saved=None, max_history=None):
+        """
+        Args:
+            document: First current version
+            saved: Version reset() returns to, default document itself
+            max_history (int): Versions kept for undo, default settings.EDIT_HISTORY_LIMIT
+        """
+        self.max_history = max_history or settings.EDIT_HISTORY_LIMIT
+        self._versions = [document]
+        self._index = 0
+        self._saved = document if saved is None else saved
+        # Bumped whenever current jumps to another version, so edit widgets
+        # keyed on it are rebuilt from the store instead of keeping stale input
+        self.epoch = 0
+
+    @property
+    def current(self):
+        return self._versions[self._index]
+
+    @property
+    def saved(self):
+        return self._saved
+
+    @property
+    def is_dirty(self):
+        return self.current is not self._saved
+
+    @property
+    def can_undo(self):
+        return self._index > 0
+
+    @property
+    def can_redo(self):
+        return self._index < len(self._versions) - 1
+
+    def _push(self, document):
+        del self._versions[self._index + 1:]
+        self._versions.append(document)
+        if len(self._versions) > self.max_history:
+            del self._versions[:len(self._versions) - self.max_history]
+        self._index = len(self._versions) - 1
+
+    def set(self, path, value):
+        """
+        Record an edit as a new version
+
+        Args:
+            path (tuple): Where to put value in the document
+            value: New value
+
+        Returns:
+            bool: False if the value was already there and nothing was recorded
+        """
+        if get_in(self.current, path) == value:
+            return False
+        self._push(assoc_in(self.current, path, value))
+        return True
+
+    def load(self, path, value):
+        """Replace a part of both the current and saved versions, starting a new history"""
+        current = assoc_in(self.current, path, value)
+        self._saved = current if self.current is self._saved else assoc_in(self._saved, path, value)
+        self._versions = [current]
+        self._index = 0
+        self.epoch += 1
+
+    def undo(self):
+        if self.can_undo:
+            self._index -= 1
+            self.epoch += 1
+
+    def redo(self):
+        if self.can_redo:
+            self._index += 1
+            self.epoch += 1
+
+    def reset(self):
+        """Go back to the saved version; the discarded edits stay available to undo"""
+        if self.is_dirty:
+            self._push(self._saved)
+            self.epoch += 1
+
+    def mark_saved(self):
+        """Make the current version the one reset() returns to"""
+        self._saved = self.current